@@ -1,232 +1,251 @@
-import matplotlib.pyplot as plt
-import glob
+import json
+import os
+import re
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from scipy import interpolate
 import numpy as np
 import pandas as pd
-from natsort import natsorted
 
-def plot_GC_data(filepath, line1):
+
+# Name of the per-folder directory holding binary copies of parsed ASC files, see enable_binary_cache
+BINARY_CACHE_DIR = '.asc_cache'
+
+
+def read_chromatogram(filepath, data_start_line: int=25):
+    """Reads both detector columns of an ASC file into an array, parsing each file only once.
+
+    Parsed traces are kept in an LRU cache keyed by path and modification time, so the plotting and
+    integration functions can all call this without re-reading the file. A file that is rewritten
+    (e.g. while the GC is still acquiring) gets a new mtime and is parsed again.
+    
+    If the binary cache is enabled for the file's folder (see enable_binary_cache), the parsed array is also
+    saved as .npy and memory-mapped in later sessions instead of parsing the text again.
+
+    Args:
+        filepath (str): path to ASC file
+        data_start_line (int, optional): number of header lines before the data. Defaults to 25.
+
+    Returns:
+        np.ndarray: read-only (samples, 2) integer array. Column 0 is Type[0] (used for TCD), column 1 is Type[1] (used for FID).
+    """
+    path = os.path.abspath(filepath)
+    return _read_chromatogram_cached(path, os.stat(path).st_mtime_ns, data_start_line)
+
+
+@lru_cache(maxsize=512)
+def _read_chromatogram_cached(path, mtime_ns, data_start_line):
+    folder, name = os.path.split(path)
+    cache_dir = os.path.join(folder, BINARY_CACHE_DIR)
+    use_binary_cache = os.path.isdir(cache_dir)
+    if use_binary_cache:
+        # The sidecar is stamped with the mtime of the ASC file it was parsed from, so any change invalidates it
+        sidecar = os.path.join(cache_dir, name + '.' + str(data_start_line) + '.npy')
+        try:
+            if os.stat(sidecar).st_mtime_ns == mtime_ns:
+                return np.load(sidecar, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+    
+    # np.loadtxt skips the blank lines that the old readlines() loops filtered out by hand
+    trace = np.loadtxt(path, delimiter=',', skiprows=data_start_line, usecols=(0, 1), dtype=np.int64, ndmin=2)
+    trace.setflags(write=False) # cached arrays are shared between callers
+    
+    if use_binary_cache:
+        # Write next to the sidecar and swap it in, so readers never see a partial file.
+        # A failed write (read-only share, file mapped by another process on Windows) only costs the cache.
+        try:
+            with open(sidecar + '.tmp', 'wb') as f:
+                np.save(f, trace)
+            os.utime(sidecar + '.tmp', ns=(mtime_ns, mtime_ns))
+            os.replace(sidecar + '.tmp', sidecar)
+        except OSError:
+            pass
+    return trace
+
+
+def clear_chromatogram_cache():
+    """Empties the parsed-trace cache used by read_chromatogram"""
+    _read_chromatogram_cached.cache_clear()
+
+
+def enable_binary_cache(folderpath):
+    """Turns on the binary cache for a folder of ASC files.
+
+    Parsed chromatograms are written to folderpath/.asc_cache as .npy files the first time they are read,
+    and memory-mapped afterwards, so re-opening old runs is near-instant and traces are paged in from disk
+    instead of held in RAM. Entries are invalidated when the ASC file's mtime changes.
+    Delete the .asc_cache folder to turn the cache off again.
+    """
+    os.makedirs(os.path.join(folderpath, BINARY_CACHE_DIR), exist_ok=True)
+
+
+def plot_GC_data(filepath, line1, ax=None):
     '''
     Opens and plots GC data. This code throws out the header of the ACS file and reads until the last line of data
-    Using the 9 minute GC program. Splits lines by comma.
+    Using the 9 minute GC program.
+    Draws on the current pyplot axes unless ax is given.
     '''
-    with open(filepath,'r') as f: #open file
-        lines = f.readlines()[line1:] # make an array of lines that include data
-    yvalues = []
-    for line in lines:
-        if line.strip() == '':
-            continue
-        else:
-            Type = line.split(",")
-            yval = int(Type[1]) # only considering first column of data (Type[0] = Type[1]), convert to int
-            yvalues.append(yval)
+    yvalues = read_chromatogram(filepath, line1)[:, 1] # only considering first column of data (Type[0] = Type[1])
     end_time = len(yvalues) / 5 #sampling rate is 5 / second
     xvalues = np.linspace(0, end_time, len(yvalues))
     
-    plt.plot(xvalues, yvalues)
-    plt.xlabel("Retention time (seconds)")
-    plt.ylabel("Intensity")
+    if ax is None:
+        import matplotlib.pyplot as plt
+        ax = plt.gca()
+    ax.plot(xvalues, yvalues)
+    ax.set_xlabel("Retention time (seconds)")
+    ax.set_ylabel("Intensity")
     # plt.savefig(filename + '.png', dpi=600)
     
 
-def integrate_peak(filepath, xleft, xright, data_start_line, thresh, smooth, gas, suppress_outputs: bool=False):
+def fit_window(yvalues, xleft, xright, smooth):
+    """Fits a window of a chromatogram with a cubic spline and evaluates it on the 0.2 s grid.
+
+    Smoothing the second derivative of the spline fit as much as possible is important for determining peak edges.
+
+    Args:
+        yvalues (array): detector signal inside the window, sampled at 5 / second
+        xleft (int): left edge of the window in seconds
+        xright (int): right edge of the window in seconds
+        smooth (float): smoothing factor passed to interpolate.splrep
+
+    Returns:
+        tuple: xnew, ynew (spline) and y2der (second derivative of the spline) arrays
+    """
+    xvalues = np.linspace(xleft, xright, len(yvalues))
+    tck = interpolate.splrep(xvalues, yvalues, k=3, s=smooth)
+    xnew = np.arange(xleft, xright, 0.2)
+    ynew = interpolate.splev(xnew, tck, der=0)
+    y2der = interpolate.splev(xnew, tck, der=2) # take second derivative of the spline fit
+    return xnew, ynew, y2der
+
+
+def peak_integral(xnew, ynew, y2der, thresh, suppress_outputs: bool=False):
+    """Finds the peak edges and integrates the baseline corrected peak of an evaluated spline.
+
+    The edges are the first and last points where the second derivative is >= thresh.
+    The baseline is a straight line between the two peak edges.
+
+    Args:
+        xnew, ynew, y2der (array): output of fit_window
+        thresh (float): second derivative threshold for the peak edges
+
+    Returns:
+        tuple: integral (np.nan if there is no peak), xpeak, ypeak and y_base arrays (None if there is no peak)
+    """
+    edges = np.flatnonzero(y2der >= thresh)
+    if edges.size == 0:
+        if suppress_outputs is False:
+            print('no peak')
+        return np.nan, None, None, None
     
-    with open(filepath, 'r') as f:
-    # Define first and last lines to be read from ASC file. The data starts at data_start_line. 
-        lines = f.readlines()[data_start_line:]
-        
-        newlines = []
-        for line in lines:
-            if line.strip() == '':
-                continue
-            else:
-                newlines.append(line)
-        # The step size is 0.2, so multiply the x position by 5 and add data_start_line to convert to line number
-        line1 = xleft * 5 + data_start_line
-        line2 = xright * 5 + data_start_line
-        
-        newlinesarray = newlines[line1:line2]
-
-        # Fill arrays for x and y values with first column of data points from the ASC file
-        xvalues = []
-        yvalues = []
-        for line in newlinesarray:
-            Type = line.split(",")        
-            yval = int(Type[1]) # only considering first column of data (Type[0] = Type[1]), convert to int
-            xvalues = np.linspace(xleft, xright, (line2 - line1))
-            yvalues.append(yval)
-        
-        
-        # Fit the data with a cubic spine with smooth factor of 1000.
-        # Smoothing the second derivative of the spline fit as much as possible is important for determining peak edges.
-        tck = interpolate.splrep(xvalues, yvalues, k=3, s=smooth)
-        xnew = np.arange(xleft, xright, 0.2)
-        ynew = interpolate.splev(xnew, tck, der=0)
-
-        # take second derivative of the spline fit
-        y2der = interpolate.splev(xnew, tck, der=2)
-        
-        if np.amax(y2der) < thresh:
-            if suppress_outputs is False:
-                print('no peak')
-            return np.nan
-
-        # Find the left edge of the peak, assuming edge of peak starts when 2nd der >= thresh
-        for idx, x in zip(range(0,len(xnew)), xnew):
-            if y2der[idx] >= thresh:
-                left_edge_idx = idx
-                break 
-        
-        # Find the right edge of the peak, assuming edge of peak starts when 2nd der >= thresh
-        for idx, x in zip(reversed(range(0,len(xnew))), xnew):
-            if y2der[idx] >= thresh:
-                right_edge_idx = idx
-                break
-        
-        # If the peak has no width, return integral of NaN, warn user, but don't exit the script
-        try:
-            # Set up arrays that only include the peaks
-            xpeak = xnew[left_edge_idx:right_edge_idx]
-            ypeak = ynew[left_edge_idx:right_edge_idx]
-
-            # Set up baseline function as a straight line between the two peak edges
-            m = (ypeak[right_edge_idx - left_edge_idx - 1] - ypeak[0])/(xpeak[right_edge_idx - left_edge_idx - 1] - xpeak[0])
-            b = ypeak[0] - m * xpeak[0]
-            y_base = m * xpeak + b
-        except IndexError:
-            if left_edge_idx == right_edge_idx:
-                if suppress_outputs is False:
-                    print('Left and right peak edges have the same index (the peak has no width)')
-            return np.NAN # Kill this function call if IndexError is raised, but continue script
-        
-        # Subtract the baseline from the peak
-        y_base_corr = []
-        for y, z in zip(ypeak, y_base):
-            y_bc = y - z
-            y_base_corr.append(y_bc)
-           
-        # Integrate the Baseline Corrected peak
-        integral = np.trapz(y_base_corr, dx=0.2)
-        
-        # Return plot outputs
+    # If the peak has no width, return integral of NaN, warn user, but don't exit the script
+    left_edge_idx, right_edge_idx = edges[0], edges[-1]
+    if left_edge_idx == right_edge_idx:
         if suppress_outputs is False:
-            plt.figure()
-            plt.plot(xpeak, ypeak, xpeak, y_base, 'r')
-            plt.legend(['Spline', 'Baseline'])
-            plt.title(gas +' Spline with Baseline')
-            # plt.savefig(gas + 'splinewithbaseline.png', dpi=600)
-            plt.show()
+            print('Left and right peak edges have the same index (the peak has no width)')
+        return np.nan, None, None, None
 
-            plt.figure()
-            plt.plot(xpeak, y_base_corr)
-            plt.title(gas + ' Baseline Corrected')
-            # plt.savefig(gas + 'baselinecorrected.png', dpi=600)
-            plt.show()
+    # Set up arrays that only include the peaks
+    xpeak = xnew[left_edge_idx:right_edge_idx]
+    ypeak = ynew[left_edge_idx:right_edge_idx]
 
-            '''for idx, x, y in zip(range(0,len(xnew)), xnew, y2der):
-                        print(idx,x, y) '''      
-            print(integral)
-            
-        return integral
+    # Set up baseline function as a straight line between the two peak edges, and subtract it from the peak
+    m = (ypeak[-1] - ypeak[0]) / (xpeak[-1] - xpeak[0])
+    b = ypeak[0] - m * xpeak[0]
+    y_base = m * xpeak + b
+    y_base_corr = ypeak - y_base
 
+    # Integrate the Baseline Corrected peak (trapezoidal rule, dx=0.2)
+    integral = (0.2 * (y_base_corr[1:] + y_base_corr[:-1]) / 2.0).sum()
+    return integral, xpeak, ypeak, y_base
 
-def integrate_TCD_peak(filepath, xleft, xright, data_start_line, thresh, smooth, suppress_outputs: bool=False):
-    
-    with open(filepath, 'r') as f:
-    # Define first and last lines to be read from ASC file. The data starts at data_start_line
-        lines = f.readlines()[data_start_line:]
-        newlines=[]
-        for line in lines:
-            if line.strip() == '':
-                continue
-            else:
-                newlines.append(line)
 
-    # The step size is 0.2, so multiply the x position by 5 and add data_start_line to convert to line number
-        line1 = xleft*5 + data_start_line
-        line2 = xright*5 + data_start_line
+def integrate_window(trace, xleft, xright, data_start_line, thresh, smooth, column: int=1, polarity: int=1,
+                     gas: str='', suppress_outputs: bool=False, diagnostics: list=None):
+    """Integration core shared by integrate_peak (FID) and integrate_TCD_peak (TCD)
 
-        newlinesarray = newlines[line1:line2]
-        
-        xvalues = []
-        yvalues = []
-        for line in newlinesarray:
-            Type = line.split(",")
-            yval = -int(Type[0]) # This minus sign is the only fundamental difference between FID and TCD integration.
-            xvalues = np.linspace(xleft, xright, (line2 - line1))
-            yvalues.append(yval)
-
-        tck = interpolate.splrep(xvalues, yvalues, k=3, s=smooth)
-        xnew = np.arange(xleft, xright, 0.2)
-        ynew = interpolate.splev(xnew, tck, der=0)
-
-        # take second derivative of the spline fit
-        y2der = interpolate.splev(xnew, tck, der=2)
-        
-        if np.amax(y2der) < thresh:
-            if suppress_outputs is False:
-                print('no peak')
-            return np.nan
-
-        # Find the left edge of the peak, assuming edge of peak starts when 2nd der >= thresh
-        for idx, x in zip(range(0, len(xnew)), xnew):
-            if y2der[idx] >= thresh:
-                left_edge_idx = idx
-                break
+    Args:
+        trace (np.ndarray): array returned by read_chromatogram
+        xleft (int): left edge of the window in seconds
+        xright (int): right edge of the window in seconds
+        data_start_line (int): number of header lines in the ASC file
+        thresh (float): second derivative threshold for the peak edges
+        smooth (float): smoothing factor for the spline fit
+        column (int, optional): detector column of the trace. Defaults to 1 (FID).
+        polarity (int, optional): 1 for peaks pointing up, -1 to flip the signal (TCD). Defaults to 1.
+        gas (str, optional): name used in plot titles. Defaults to ''.
+        suppress_outputs (bool, optional): Defaults to False.
+        diagnostics (list, optional): if given, the peak arrays are appended to it for render_GC_diagnostics
+            instead of being plotted. Defaults to None.
+
+    Returns:
+        float: baseline corrected integral of the (polarity corrected) peak
+    """
+    # The step size is 0.2, so multiply the x position by 5 and add data_start_line to convert to line number
+    line1 = xleft * 5 + data_start_line
+    line2 = xright * 5 + data_start_line
+    yvalues = polarity * trace[line1:line2, column]
+    
+    xnew, ynew, y2der = fit_window(yvalues, xleft, xright, smooth)
+    integral, xpeak, ypeak, y_base = peak_integral(xnew, ynew, y2der, thresh, suppress_outputs=suppress_outputs)
+    
+    # Return plot outputs
+    if diagnostics is not None:
+        diagnostics.append({'kind': 'peak', 'gas': gas, 'integral': integral,
+                            'xpeak': xpeak, 'ypeak': ypeak, 'y_base': y_base})
+    elif suppress_outputs is False and xpeak is not None:
+        import matplotlib.pyplot as plt
+        _plot_peak(plt.figure().gca(), xpeak, ypeak, y_base, gas)
+        plt.show()
+
+        _plot_baseline_corrected(plt.figure().gca(), xpeak, ypeak, y_base, gas)
+        plt.show()
+    
+    if suppress_outputs is False and xpeak is not None:
+        print(integral)
         
-        # Find the right edge of the peak, assuming edge of peak starts when 2nd der >= thresh
-        for idx, x in zip(reversed(range(0, len(xnew))), xnew):
-            if y2der[idx] >= thresh:
-                right_edge_idx = idx
-                break
+    return integral
 
-        # Set up arrays that only include the peaks
-        xpeak = xnew[left_edge_idx:right_edge_idx]
-        ypeak = ynew[left_edge_idx:right_edge_idx]
 
-        # If the peak has no width, return integral of NaN, warn user, but don't exit the script
-        try:
-            # Set up arrays that only include the peaks
-            xpeak = xnew[left_edge_idx:right_edge_idx]
-            ypeak = ynew[left_edge_idx:right_edge_idx]
-
-            # Set up baseline function as a straight line between the two peak edges
-            m = (ypeak[right_edge_idx - left_edge_idx - 1] - ypeak[0])/(xpeak[right_edge_idx - left_edge_idx - 1] - xpeak[0])
-            b = ypeak[0] - m * xpeak[0]
-            y_base = m * xpeak + b
-        except IndexError:
-            if left_edge_idx == right_edge_idx:
-                if suppress_outputs is False:
-                    print('Left and right peak edges have the same index (the peak has no width)')
-            return np.NAN # Kill this function call if IndexError is raised, but continue script
-
-        # Subtract the baseline from the peak
-        y_base_corr = []
-        for y, z in zip(ypeak, y_base):
-            y_bc = y - z
-            y_base_corr.append(y_bc)
-
-        # Integrate the Baseline Corrected peak
-        integral = np.trapz(y_base_corr, dx=0.2)
+def _plot_peak(ax, xpeak, ypeak, y_base, gas):
+    ax.plot(xpeak, ypeak, xpeak, y_base, 'r')
+    ax.legend(['Spline', 'Baseline'])
+    ax.set_title(gas +' Spline with Baseline')
+    # plt.savefig(gas + 'splinewithbaseline.png', dpi=600)
 
 
-        if suppress_outputs is False:
-            plt.figure()
-            plt.plot(xpeak, ypeak, xpeak, y_base, 'r')
-            plt.legend(['Spline','Baseline'])
-            plt.title('H2 Spline with Baseline')
-            # plt.savefig('h2splinewithbaseline.png', dpi=600)
-            plt.show()
+def _plot_baseline_corrected(ax, xpeak, ypeak, y_base, gas):
+    ax.plot(xpeak, ypeak - y_base)
+    ax.set_title(gas + ' Baseline Corrected')
+    # plt.savefig(gas + 'baselinecorrected.png', dpi=600)
 
-            plt.figure()
-            plt.plot(xpeak, y_base_corr)
-            plt.title('H2 Baseline Corrected')
-            # plt.savefig('h2baselinecorrected.png', dpi=600)
-            plt.show()
 
-            print(integral)
-            
-        return integral
+# Detector column of the ASC file and signal polarity used by integrate_window
+DETECTORS = {'FID': (1, 1),
+             'TCD': (0, -1)}
+
+
+def integrate_peak(filepath, xleft, xright, data_start_line, thresh, smooth, gas, suppress_outputs: bool=False,
+                   diagnostics: list=None):
+    
+    # only considering first column of data (Type[0] = Type[1])
+    trace = read_chromatogram(filepath, data_start_line)
+    return integrate_window(trace, xleft, xright, data_start_line, thresh, smooth, column=1, polarity=1, gas=gas,
+                            suppress_outputs=suppress_outputs, diagnostics=diagnostics)
+
+
+def integrate_TCD_peak(filepath, xleft, xright, data_start_line, thresh, smooth, suppress_outputs: bool=False,
+                       diagnostics: list=None, gas: str='H2'):
+    
+    # The minus sign (polarity=-1) is the only fundamental difference between FID and TCD integration.
+    trace = read_chromatogram(filepath, data_start_line)
+    return integrate_window(trace, xleft, xright, data_start_line, thresh, smooth, column=0, polarity=-1, gas=gas,
+                            suppress_outputs=suppress_outputs, diagnostics=diagnostics)
     
     
 # For 9 minute CO program, the plot values are: 26,5424
@@ -245,89 +264,266 @@ def integrate_TCD_peak(filepath, xleft, xright, data_start_line, thresh, smooth,
 # H2thresh=-2500
 # smooth=10
 
-def handle_GC_data(folderpath,
-                   COleft, COright, COthresh,
-                   CH4left, CH4right, CH4thresh,
-                   C2H4left, C2H4right, C2H4thresh, 
-                   H2left, H2right, H2thresh, smooth,
-                   data_start_line: int=25,
-                   suppress_outputs: bool=False):
-    
-    # This glob.glob makes an array of all the file names with ASC. 
-    filenames = glob.glob(folderpath + '/*.ASC')
-    natsortedfilenames = natsorted(filenames)
-    
-    # Instantiate arrays that will contain the files from both detectors
-    run = {}
+# The same values as a peak table for integrate_peaks / handle_GC_data(peaks=...). More analytes are added as rows.
+GC_PEAKS_9MIN = pd.DataFrame({'detector': ['FID', 'FID', 'FID', 'TCD'],
+                              'left': [180, 200, 460, 90],
+                              'right': [220, 250, 520, 105],
+                              'thresh': [280, 1000, 1000, -2500]},
+                             index=pd.Index(['CO', 'CH4', 'C2H4', 'H2'], name='gas'))
+
+
+def render_GC_diagnostics(diagnostics: list, pdf_path: str=None):
+    """Draws the figures of a headless run from the arrays stored in diagnostics.
+
+    Args:
+        diagnostics (list): list filled by handle_GC_data, integrate_N2 or integrate_peak
+        pdf_path (str, optional): save one page per chromatogram and per peak to this multi-page PDF
+            without opening any windows. Defaults to None (show the figures with pyplot).
+    """
+    if pdf_path is not None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_pdf import PdfPages
+        with PdfPages(pdf_path) as pdf:
+            for record in diagnostics:
+                fig = Figure(figsize=(8, 3))
+                _draw_record(fig, record)
+                pdf.savefig(fig)
+    else:
+        import matplotlib.pyplot as plt
+        for record in diagnostics:
+            _draw_record(plt.figure(figsize=(8, 3)), record)
+            plt.show()
+
+
+def _draw_record(fig, record):
+    if record['kind'] == 'trace':
+        yvalues = record['trace']
+        ax = fig.add_subplot(111)
+        ax.plot(np.linspace(0, len(yvalues) / 5, len(yvalues)), yvalues) #sampling rate is 5 / second
+        ax.set_xlabel("Retention time (seconds)")
+        ax.set_ylabel("Intensity")
+        ax.set_title(os.path.basename(record['file']))
+    elif record['xpeak'] is None:
+        fig.text(0.5, 0.5, record['gas'] + ': no peak', ha='center')
+    else:
+        ax1, ax2 = fig.subplots(1, 2)
+        _plot_peak(ax1, record['xpeak'], record['ypeak'], record['y_base'], record['gas'])
+        _plot_baseline_corrected(ax2, record['xpeak'], record['ypeak'], record['y_base'], record['gas'])
+        fig.suptitle(record['gas'] + ' integral: ' + str(record['integral']))
+
+
+def integrate_peaks(files: dict, peaks: pd.DataFrame=GC_PEAKS_9MIN, smooth: float=10, data_start_line: int=25,
+                    suppress_outputs: bool=True, diagnostics: list=None) -> pd.DataFrame:
+    """Integrates every peak of one injection, as listed in a peak table.
+
+    Each window is fit on its own with integrate_window, exactly as integrate_peak / integrate_TCD_peak do, so the
+    integrals are identical to theirs. Overlapping windows (e.g. CO at 180-220 s and CH4 at 200-250 s) are not fit
+    as one region: smooth is an absolute spline smoothing factor, and over a wider region the same value lets the
+    spline oscillate wildly. This is the per-injection core of handle_GC_data, update_GC_data and integrate_N2,
+    so analytes are added by adding rows to the table.
+
+    Args:
+        files (dict): detector name ('FID', 'TCD') to ASC file path for this injection
+        peaks (pd.DataFrame, optional): table indexed by gas with columns detector, left, right, thresh. Defaults to GC_PEAKS_9MIN.
+        smooth (float, optional): smoothing factor for the spline fits. Defaults to 10.
+        data_start_line (int, optional): number of header lines in the ASC files. Defaults to 25.
+        suppress_outputs (bool, optional): skip plots and printing. Defaults to True.
+        diagnostics (list, optional): if given, traces and peak arrays are appended to it instead of being plotted.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: peaks with an added integral column. Integrals have the sign of the raw detector signal,
+        so TCD peaks match the H2 column of handle_GC_data. Detectors missing from files give NaN.
+    """
+    integrals = pd.Series(np.nan, index=peaks.index, name='integral')
+    for detector, detector_peaks in peaks.groupby('detector', sort=False):
+        if detector not in files:
+            continue
+        column, polarity = DETECTORS[detector]
+        filename = files[detector]
+        trace = read_chromatogram(filename, data_start_line)
+        if suppress_outputs is False:
+            print(filename)
+        if diagnostics is not None:
+            diagnostics.append({'kind': 'trace', 'file': filename, 'trace': np.array(trace[:, 1])})
+        elif suppress_outputs is False:
+            plot_GC_data(filename, data_start_line)
+        for gas, left, right, thresh in detector_peaks[['left', 'right', 'thresh']].itertuples(name=None):
+            if suppress_outputs is False:
+                print(gas)
+            integrals[gas] = polarity * integrate_window(trace, left, right, data_start_line, thresh, smooth,
+                                                         column=column, polarity=polarity, gas=gas,
+                                                         suppress_outputs=suppress_outputs, diagnostics=diagnostics)
     
-    string_list = []
-    for filename in natsortedfilenames:
-        string_list.append(filename[-6:-4]) # Will throw error if file run number is > 99 (i.e. --D100)
+    return peaks.assign(integral=integrals)
+
+
+def _peaks_from_windows(peaks: pd.DataFrame=None, **windows) -> pd.DataFrame:
+    """Peak table for the functions that also take the CO, CH4, C2H4 and H2 windows as separate arguments
+
+    Args:
+        peaks (pd.DataFrame, optional): peak table given by the caller. Defaults to None.
+        windows: COleft=..., H2thresh=... as passed to handle_GC_data. All None if the caller gave none.
+
+    Returns:
+        pd.DataFrame: peaks, the table built from the windows, or GC_PEAKS_9MIN if neither was given
+    """
+    given = {name: value for name, value in windows.items() if value is not None}
+    if len(given) == 0:
+        return GC_PEAKS_9MIN if peaks is None else peaks
+    if peaks is not None:
+        raise ValueError('Give either a peaks table or the peak window arguments, not both')
+    missing = [name for name, value in windows.items() if value is None]
+    if len(missing) > 0:
+        raise ValueError('Missing peak window arguments: ' + ', '.join(missing))
+    gases = list(GC_PEAKS_9MIN.index)
+    return GC_PEAKS_9MIN.assign(left=[windows[gas + 'left'] for gas in gases],
+                                right=[windows[gas + 'right'] for gas in gases],
+                                thresh=[windows[gas + 'thresh'] for gas in gases])
+
+
+# Run files are named like <prefix>FID12.ASC / <prefix>TCD12.ASC, with run numbers of any width
+GC_FILENAME = re.compile(r'(FID|TCD)[ _-]?(\d+)\.ASC$', re.IGNORECASE)
+
+
+def index_GC_folder(folderpath, report: bool=True) -> dict:
+    """Indexes the ASC files in a folder by run number in a single pass over the directory.
+
+    Args:
+        folderpath (string): folder with ASC files
+        report (bool, optional): warn about runs missing a detector, duplicated files and gaps in the run numbers.
+            Defaults to True.
+
+    Returns:
+        dict: run number (int, ascending) to {'FID': path, 'TCD': path}. A detector with no file is absent.
+    """
+    index = {}
+    duplicates = []
+    with os.scandir(folderpath) as entries:
+        for entry in entries:
+            match = GC_FILENAME.search(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            detector, number = match.group(1).upper(), int(match.group(2))
+            files = index.setdefault(number, {})
+            if detector in files:
+                duplicates.append(entry.path)
+                files[detector] = min(files[detector], entry.path)
+            else:
+                files[detector] = entry.path
+    index = {number: {detector: index[number][detector] for detector in DETECTORS if detector in index[number]}
+             for number in sorted(index)}
     
-    string_list = sorted(list(set(string_list))) # remove duplicates from finding TCD and FID run numbers
-    fire_numbers = sorted([int(i) for i in string_list])
-    # print(fire_numbers)
-    for idx, number in enumerate(fire_numbers):
-        run[number] = []
-        for filename in natsortedfilenames:
-            if 'D' + string_list[idx] + '.ASC' in filename:
-                run[number].append(filename)
-                
-    peak_dict = {}
-    for key in run:
-        peak_dict[key] = {}
-        for filename in run[key]:
+    if report is True and len(index) > 0:
+        unpaired = {number: list(files) for number, files in index.items() if len(files) < len(DETECTORS)}
+        missing = sorted(set(range(min(index), max(index) + 1)).difference(index))
+        if len(unpaired) > 0:
+            warnings.warn('Runs with only one detector file: ' + str(unpaired))
+        if len(missing) > 0:
+            warnings.warn('Run numbers missing from ' + str(folderpath) + ': ' + str(missing))
+        if len(duplicates) > 0:
+            warnings.warn('Ignored duplicate run files: ' + str(duplicates))
+    return index
+
+
+def _integrate_run(files: dict, peaks: pd.DataFrame, smooth, data_start_line: int=25,
+                   suppress_outputs: bool=False, diagnostics: bool=False) -> tuple:
+    """Integrates all peaks of one injection with integrate_peaks
+
+    Args:
+        files (dict): detector to ASC file of this run, as returned by index_GC_folder
+        peaks (pd.DataFrame): peak table, see integrate_peaks
+        diagnostics (bool, optional): store traces and peak arrays instead of plotting them. Defaults to False.
+
+    Returns:
+        tuple: dict of gas to peak integral, and the list of diagnostics records (None if not requested)
+    """
+    records = [] if diagnostics is True else None
+    integrals = integrate_peaks(files, peaks, smooth, data_start_line, suppress_outputs, records)['integral']
+    return integrals.to_dict(), records
+
+
+def _integrate_runs(run: dict, peaks: pd.DataFrame, smooth, data_start_line: int=25,
+                    suppress_outputs: bool=False, workers: int=None, diagnostics: list=None) -> pd.DataFrame:
+    """Integrates every run, serially or in a process pool, and builds the peak table once
+
+    Returns:
+        pd.DataFrame: one row per run, indexed by run number
+    """
+    keep = diagnostics is not None
+    if workers is None:
+        results = []
+        for key in run:
+            result = _integrate_run(run[key], peaks, smooth, data_start_line, suppress_outputs, keep)
+            results.append(result)
             
-            # Treat the FID Data First
-            if 'FID' in filename:
-                    if suppress_outputs is False:
-                        print(filename)
-                        plot_GC_data(filename, data_start_line)
-                    
-                    # integrate CO peak. Typical peak on CO2 GC shows up between 175 and 235 seconds, and has a 
-                    # second derivative threshold of 2500
-                    if suppress_outputs is False:
-                        print('CO')
-                    CO_int = integrate_peak(filename, COleft, COright, data_start_line, COthresh, smooth, 'CO', suppress_outputs=suppress_outputs)
-                    peak_dict[key]['CO'] = CO_int
-
-                    # integrate CH4 peak. Typical peak on CO2 GC shows up between 240 and 300 seconds, and has a 
-                    # second derivative threshold of 2500
-                    if suppress_outputs is False:
-                        print('CH4')
-                    CH4_int = integrate_peak(filename, CH4left, CH4right, data_start_line, CH4thresh, smooth, 'CH4', suppress_outputs=suppress_outputs)
-                    peak_dict[key]['CH4'] = CH4_int
-
-                    # integrate C2H4 peak. Typical peak on CO2 GC shows up between 525 and 600 seconds, and has a 
-                    # second derivative threshold of 2500
-                    if suppress_outputs is False:
-                        print('C2H4')
-                    C2H4_int = integrate_peak(filename, C2H4left, C2H4right, data_start_line, C2H4thresh, smooth, 'C2H4', suppress_outputs=suppress_outputs)
-                    peak_dict[key]['C2H4'] = C2H4_int
-
-
-            # Treat the TCD Data Second
-            '''Integrate H2 peak. Typical peak shows up on CO2 GC between 150 and 230 seconds, and has a
-            second derivative threshold of -2500. 
-            ALSO CHANGED NEGATIVE SIGN IN FRONT OF H2_INT. 
-            Peak pointed up is between 320 and 360. Pretty confident that the peak below between
-            130 and 160 is the right one, it is the only one of the two that changes with increasing H2 
-            conc for the calibration'''
-            if 'TCD' in filename: 
-                if suppress_outputs is False:
-                    print(filename)
-                    plot_GC_data(filename, data_start_line)
-                    print('H2')
-                H2_int = integrate_TCD_peak(filename, H2left, H2right, data_start_line, H2thresh, smooth, suppress_outputs=suppress_outputs)
-                peak_dict[key]['H2'] = - H2_int
-
-        # print("Peak dict:\n", peak_dict)
-        df = pd.DataFrame(peak_dict).T  # transpose
-        
-        # print recently computed peak table to user
-        if suppress_outputs is False:
-            print(df.tail())
-        
+            # print recently computed peaks to user
+            if suppress_outputs is False:
+                print(pd.DataFrame([result[0]], index=[key]))
+    else:
+        # Plots cannot be shown from worker processes, so workers always run quietly.
+        # executor.map returns results in submission order, i.e. run-number order.
+        n = len(run)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_integrate_run, run.values(), repeat(peaks, n),
+                                        repeat(smooth, n), repeat(data_start_line, n), repeat(True, n), repeat(keep, n),
+                                        chunksize=max(1, n // (4 * workers))))
+    
+    df = pd.DataFrame([integrals for integrals, records in results], index=list(run), columns=peaks.index)
+    df.columns.name = None
+    if keep:
+        for integrals, records in results:
+            diagnostics.extend(records)
+    if suppress_outputs is False and workers is not None:
+        print(df.tail())
+    return df
+
+
+def handle_GC_data(folderpath,
+                   COleft=None, COright=None, COthresh=None,
+                   CH4left=None, CH4right=None, CH4thresh=None,
+                   C2H4left=None, C2H4right=None, C2H4thresh=None, 
+                   H2left=None, H2right=None, H2thresh=None, smooth=10,
+                   data_start_line: int=25,
+                   suppress_outputs: bool=False,
+                   workers: int=None,
+                   binary_cache: bool=False,
+                   diagnostics: list=None,
+                   peaks: pd.DataFrame=None):
+    """Integrates the peaks of every injection in a folder: CO, CH4, C2H4 (FID) and H2 (TCD) by default,
+    or any peaks listed in a peak table
+
+    Args:
+        folderpath (string): folder with ASC files
+        COleft, CH4left, ... (int, optional): left edge limits of the peak windows in seconds
+        COright, CH4right, ... (int, optional): right edge limits of the peak windows in seconds
+        COthresh, CH4thresh, ... (int, optional): second derivative thresholds for peak picking.
+            Either all twelve window arguments or none of them; with none, peaks is used.
+        smooth (int, optional): smooth value for the spline fits. Defaults to 10.
+        data_start_line (int, optional): number of header lines in the ASC files. Defaults to 25.
+        suppress_outputs (bool, optional): skip plots and printing. Defaults to False.
+        workers (int, optional): number of processes used to integrate injections in parallel.
+            Defaults to None (serial). Parallel runs never plot. On Windows, call from a notebook
+            or from a script guarded by if __name__ == '__main__'.
+        binary_cache (bool, optional): enable the memory-mapped binary cache for this folder, see enable_binary_cache.
+            Defaults to False.
+        diagnostics (list, optional): if given, traces and peak arrays are appended to it instead of being plotted,
+            and can be drawn later with render_GC_diagnostics. With suppress_outputs=True this is a headless run
+            that never imports matplotlib. Defaults to None.
+        peaks (pd.DataFrame, optional): peak table as for integrate_peaks, e.g. GC_PEAKS_9MIN with extra rows for
+            C2H6, CO2 or O2. Defaults to None (GC_PEAKS_9MIN, unless the window arguments are given).
+
+    Returns:
+        pd.DataFrame: one row per injection, one column per gas
+    """
+    if binary_cache is True:
+        enable_binary_cache(folderpath)
+    run = index_GC_folder(folderpath)
+    peaks = _peaks_from_windows(peaks, COleft=COleft, COright=COright, COthresh=COthresh,
+                                CH4left=CH4left, CH4right=CH4right, CH4thresh=CH4thresh,
+                                C2H4left=C2H4left, C2H4right=C2H4right, C2H4thresh=C2H4thresh,
+                                H2left=H2left, H2right=H2right, H2thresh=H2thresh)
+    df = _integrate_runs(run, peaks, smooth, data_start_line, suppress_outputs, workers, diagnostics)
     df.reset_index(drop=True, inplace=True) # index from 0
     return df
 
@@ -335,7 +531,11 @@ def handle_GC_data(folderpath,
 def integrate_N2(folderpath, 
                    N2left, N2right, N2thresh, smooth,
                    data_start_line: int=25,
-                   suppress_outputs: bool=False):
+                   suppress_outputs: bool=False,
+                   workers: int=None,
+                   binary_cache: bool=False,
+                   diagnostics: list=None,
+                   plot: bool=True):
     """Integrates N2 peak in TCD and draws a plot to check for leaks
 
     Args:
@@ -346,52 +546,25 @@ def integrate_N2(folderpath,
         smooth (int): smooth value for peak picking
         data_start_line (int, optional): _description_. Defaults to 25.
         suppress_outputs (bool, optional): _description_. Defaults to False.
+        workers (int, optional): number of processes, see handle_GC_data. Defaults to None (serial).
+        binary_cache (bool, optional): see handle_GC_data. Defaults to False.
+        diagnostics (list, optional): see handle_GC_data. Defaults to None.
+        plot (bool, optional): draw the leak check plot. Defaults to True.
 
     Returns:
-        _type_: df of one column, the N2 peak integral. Indexes match other peaks.
+        _type_: df of one column, the N2 peak integral. Indexes match other peaks. fig and ax are None if plot is False.
     """
-    
-    # This glob.glob makes an array of all the file names with ASC. 
-    filenames = glob.glob(folderpath + '/*.ASC')
-    natsortedfilenames = natsorted(filenames)
-    
-    # Instantiate arrays that will contain the files from both detectors
-    run = {}
-    
-    string_list = []
-    for filename in natsortedfilenames:
-        string_list.append(filename[-6:-4]) # Should throw error if file run number is > 99 (i.e. --D100)
-    
-    string_list = sorted(list(set(string_list))) # remove duplicates from finding TCD and FID run numbers
-    fire_numbers = sorted([int(i) for i in string_list])
-    # print(fire_numbers)
-    for idx, number in enumerate(fire_numbers):
-        run[number] = []
-        for filename in natsortedfilenames:
-            if 'TCD' + string_list[idx] + '.ASC' in filename:
-                run[number].append(filename)
-                
-    peak_dict = {}
-    for key in run:
-        peak_dict[key] = {}
-        for filename in run[key]:
-                
-            # Treat the TCD Data 
-            if 'TCD' in filename: 
-                if suppress_outputs is False:
-                    print(filename)
-                    plot_GC_data(filename, data_start_line)
-                N2_int = integrate_TCD_peak(filename, N2left, N2right, data_start_line, N2thresh, smooth, suppress_outputs=suppress_outputs)
-                peak_dict[key]['N2'] = - N2_int
-
-        # print("Peak dict:\n", peak_dict)
-        df = pd.DataFrame(peak_dict).T  # transpose
-        
-        # print recently computed peak table to user
-        if suppress_outputs is False:
-            print(df.tail())
-        
+    if binary_cache is True:
+        enable_binary_cache(folderpath)
+    run = {number: files for number, files in index_GC_folder(folderpath, report=False).items() if 'TCD' in files}
+    peaks = pd.DataFrame({'detector': ['TCD'], 'left': [N2left], 'right': [N2right], 'thresh': [N2thresh]},
+                         index=pd.Index(['N2'], name='gas'))
+    df = _integrate_runs(run, peaks, smooth, data_start_line, suppress_outputs, workers, diagnostics)
     df.reset_index(drop=True, inplace=True) # index from 0
+    if plot is False:
+        return df, None, None
+    
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize = (8, 3))
     ax.plot((df.index) * .15, df['N2'].replace(np.nan, 0))
     ax.set_xlabel('$t$ / h')
@@ -400,39 +573,347 @@ def integrate_N2(folderpath,
     return df, fig, ax
 
 
-def plot_FE(df, current_mA=200, methane: bool=True, total_gas: bool=True):
+@lru_cache(maxsize=4096)
+def _fit_window_cached(path, mtime_ns, data_start_line, detector, xleft, xright, smooth):
+    column, polarity = DETECTORS[detector]
+    trace = _read_chromatogram_cached(path, mtime_ns, data_start_line)
+    yvalues = polarity * trace[xleft * 5 + data_start_line:xright * 5 + data_start_line, column]
+    arrays = fit_window(yvalues, xleft, xright, smooth)
+    for array in arrays:
+        array.setflags(write=False) # cached arrays are shared between callers
+    return arrays
+
+
+def sweep_peak_integral(xnew, ynew, y2der, thresholds):
+    """Vectorized peak_integral for many thresholds of the same evaluated spline.
+
+    The baseline is linear, so its trapezoidal integral is exact and the baseline corrected integral between
+    the edges is a difference of cumulative sums. Results match peak_integral to rounding error.
+
+    Args:
+        xnew, ynew, y2der (array): output of fit_window
+        thresholds (array): second derivative thresholds
+
+    Returns:
+        np.ndarray: one integral per threshold, NaN where there is no peak or the peak has no width
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    above = y2der[np.newaxis, :] >= thresholds[:, np.newaxis]
+    has_peak = above.any(axis=1)
+    left = above.argmax(axis=1)
+    right = len(y2der) - 1 - above[:, ::-1].argmax(axis=1)
+    width = right - left # number of points between the edges, as in xnew[left:right]
+    
+    csum = np.concatenate([[0], np.cumsum(ynew)])
+    y_left, y_right = ynew[left], ynew[np.maximum(right - 1, 0)]
+    peak_area = 0.2 * (csum[right] - csum[left] - (y_left + y_right) / 2)
+    base_area = 0.2 * (width - 1) * (y_left + y_right) / 2
+    integrals = np.where(has_peak & (width > 0), peak_area - base_area, np.nan)
+    integrals[width == 1] = 0. # a single point has no area, like np.trapz
+    return integrals
+
+
+def sweep_GC_thresholds(folderpath, left, right, thresholds, smooth, detector: str='FID',
+                        data_start_line: int=25) -> pd.DataFrame:
+    """Integrates one peak window of every injection for a whole vector of thresholds at once.
+
+    The spline fit and its second derivative for each injection/window/smooth are cached, so calling again
+    with other thresholds (or other windows while keeping smooth fixed) only re-evaluates the edges and
+    integrals. Use this to calibrate COthresh, CH4thresh, H2thresh etc. for handle_GC_data.
+
+    Args:
+        folderpath (string): folder with ASC files
+        left (int): left edge of the window in seconds
+        right (int): right edge of the window in seconds
+        thresholds (array): second derivative thresholds to try
+        smooth (float): smoothing factor for the spline fits
+        detector (str, optional): 'FID' or 'TCD'. Defaults to 'FID'.
+        data_start_line (int, optional): number of header lines in the ASC files. Defaults to 25.
+
+    Returns:
+        pd.DataFrame: (runs x thresholds) grid of integrals, indexed by run number. TCD integrals have the sign
+        used for H2 in handle_GC_data.
+    """
+    column, polarity = DETECTORS[detector]
+    rows = {}
+    for number, files in index_GC_folder(folderpath, report=False).items():
+        if detector not in files:
+            continue
+        path = os.path.abspath(files[detector])
+        xnew, ynew, y2der = _fit_window_cached(path, os.stat(path).st_mtime_ns, data_start_line, detector,
+                                               left, right, smooth)
+        rows[number] = polarity * sweep_peak_integral(xnew, ynew, y2der, thresholds)
+    
+    df = pd.DataFrame.from_dict(rows, orient='index', columns=pd.Index(thresholds, name='thresh'))
+    df.index.name = 'run'
+    return df
+
+
+def _load_state(state_file, params):
+    """Reads the saved integrals of an incremental workup, discarding them if the integration parameters changed"""
+    if os.path.exists(state_file):
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+        if state.get('params') == params:
+            return state
+    return {'params': params, 'runs': {}}
+
+
+def _save_state(state_file, state):
+    # Write to a temporary file first so an interrupted save never corrupts the state
+    with open(state_file + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(state_file + '.tmp', state_file)
+
+
+def _update_GC_data(folderpath, peaks, smooth, data_start_line, suppress_outputs, workers, state_file, settle):
+    """Integrates the runs that are new or changed since the last call
+
+    Returns:
+        tuple: full peak table (indexed from 0) and the index labels of the rows integrated in this call
+    """
+    if state_file is None:
+        state_file = os.path.join(folderpath, 'GC_integrals.json')
+    params = json.loads(json.dumps({'peaks': peaks[['detector', 'left', 'right', 'thresh']].to_dict('index'),
+                                    'smooth': smooth, 'data_start_line': data_start_line}, default=float))
+    state = _load_state(state_file, params)
+    
+    # A run is (re)integrated when its set of files, or any file's size or mtime, changed.
+    # Files modified within the last settle seconds may still be written by the GC and are left for the next call.
+    run = index_GC_folder(folderpath, report=False)
+    now = time.time()
+    todo, signatures = {}, {}
+    for key, files in run.items():
+        stats = {os.path.basename(filename): os.stat(filename) for filename in files.values()}
+        if any(now - st.st_mtime < settle for st in stats.values()):
+            continue
+        signature = {filename: [st.st_size, st.st_mtime_ns] for filename, st in stats.items()}
+        saved = state['runs'].get(str(key))
+        if saved is None or saved['files'] != signature:
+            todo[key] = files
+            signatures[key] = signature
+    
+    if len(todo) > 0:
+        new = _integrate_runs(todo, peaks, smooth, data_start_line, suppress_outputs, workers)
+        for key, peaks in new.iterrows():
+            state['runs'][str(key)] = {'files': signatures[key], 'peaks': peaks.to_dict()}
+    
+    # Forget runs that are no longer in the folder
+    state['runs'] = {key: state['runs'][key] for key in map(str, run) if key in state['runs']}
+    _save_state(state_file, state)
+    
+    keys = [key for key in run if str(key) in state['runs']]
+    df = pd.DataFrame([state['runs'][str(key)]['peaks'] for key in keys])
+    new_rows = [i for i, key in enumerate(keys) if key in todo]
+    return df, new_rows
+
+
+def update_GC_data(folderpath,
+                   COleft=None, COright=None, COthresh=None,
+                   CH4left=None, CH4right=None, CH4thresh=None,
+                   C2H4left=None, C2H4right=None, C2H4thresh=None, 
+                   H2left=None, H2right=None, H2thresh=None, smooth=10,
+                   data_start_line: int=25,
+                   suppress_outputs: bool=True,
+                   workers: int=None,
+                   state_file: str=None,
+                   settle: float=5,
+                   FE_ax=None,
+                   current_mA=200,
+                   binary_cache: bool=False,
+                   peaks: pd.DataFrame=None):
+    """Incremental handle_GC_data for a folder that is still growing during an experiment.
+
+    Integrals are saved to a state file keyed on file name, size, mtime and the integration parameters.
+    Each call only integrates injections that are new or changed, so the cost of a refresh is proportional
+    to the number of new injections rather than the length of the run. Changing any parameter starts over.
+
+    Args:
+        folderpath ... workers, binary_cache, peaks: see handle_GC_data
+        state_file (str, optional): JSON file holding the saved integrals. Defaults to GC_integrals.json in folderpath.
+        settle (float, optional): files modified less than settle seconds ago are left for the next call. Defaults to 5.
+        FE_ax (optional): axes previously returned by plot_FE, redrawn with the updated table. Defaults to None.
+        current_mA (int, optional): current passed to plot_FE when FE_ax is given. Defaults to 200.
+
+    Returns:
+        pd.DataFrame: same table as handle_GC_data
+    """
+    if binary_cache is True:
+        enable_binary_cache(folderpath)
+    peaks = _peaks_from_windows(peaks, COleft=COleft, COright=COright, COthresh=COthresh,
+                                CH4left=CH4left, CH4right=CH4right, CH4thresh=CH4thresh,
+                                C2H4left=C2H4left, C2H4right=C2H4right, C2H4thresh=C2H4thresh,
+                                H2left=H2left, H2right=H2right, H2thresh=H2thresh)
+    df, new_rows = _update_GC_data(folderpath, peaks, smooth, data_start_line, suppress_outputs, workers, state_file,
+                                   settle)
+    if suppress_outputs is False:
+        print(str(len(new_rows)) + ' new injections')
+    
+    if FE_ax is not None and len(new_rows) > 0:
+        plot_FE(df, current_mA=current_mA, ax=FE_ax)
+        FE_ax.figure.canvas.draw_idle()
+    return df
+
+
+def watch_GC_data(folderpath,
+                  COleft=None, COright=None, COthresh=None,
+                  CH4left=None, CH4right=None, CH4thresh=None,
+                  C2H4left=None, C2H4right=None, C2H4thresh=None, 
+                  H2left=None, H2right=None, H2thresh=None, smooth=10,
+                  data_start_line: int=25,
+                  workers: int=None,
+                  state_file: str=None,
+                  settle: float=5,
+                  interval: float=60,
+                  binary_cache: bool=False,
+                  peaks: pd.DataFrame=None):
+    """Polls a growing GC folder and yields the rows of each newly integrated batch of injections.
+
+    Args:
+        folderpath ... settle, binary_cache, peaks: see update_GC_data
+        interval (float, optional): seconds between polls. Defaults to 60.
+
+    Yields:
+        pd.DataFrame: new rows, indexed by their position in the full handle_GC_data table
+    """
+    if binary_cache is True:
+        enable_binary_cache(folderpath)
+    peaks = _peaks_from_windows(peaks, COleft=COleft, COright=COright, COthresh=COthresh,
+                                CH4left=CH4left, CH4right=CH4right, CH4thresh=CH4thresh,
+                                C2H4left=C2H4left, C2H4right=C2H4right, C2H4thresh=C2H4thresh,
+                                H2left=H2left, H2right=H2right, H2thresh=H2thresh)
+    while True:
+        df, new_rows = _update_GC_data(folderpath, peaks, smooth, data_start_line, True, workers, state_file, settle)
+        if len(new_rows) > 0:
+            yield df.iloc[new_rows]
+        time.sleep(interval)
+
+
+# Calibrations March 2022
+# Calibrations = mA per mL GC fire / peak area per mL GC fire
+FE_CALIBRATIONS = pd.Series({'C2H4': 57.7531642857143 / 2019566.04657302,
+                             'CH4': 4.16953035714286 / 141990.386115765,
+                             'H2': -14.1597480654762 / 34959.0238571043,
+                             'CO': 0 / 715060.1018})
+
+
+def injection_times(folderpath, detector: str='FID') -> pd.Series:
+    """Timestamps of the injections in a GC folder, taken from the modification time of each run's ASC file.
+
+    The GC writes the file when the program finishes, so these mark the end of each 9 minute run.
+
+    Returns:
+        pd.Series: datetime64 timestamps, indexed from 0 like handle_GC_data
+    """
+    index = index_GC_folder(folderpath, report=False)
+    mtimes = [os.stat(files[detector]).st_mtime_ns if detector in files else np.nan for files in index.values()]
+    return pd.Series(pd.to_datetime(mtimes, unit='ns'), name='timestamp')
+
+
+def compute_FE(peaks: pd.DataFrame, current_mA=200, calibrations=FE_CALIBRATIONS, times=None, start=None,
+               interval: float=0.15, CO_flow_rate: float=1, total_flow_rate: float=20,
+               products=('H2', 'CH4', 'C2H4')) -> pd.DataFrame:
+    """Computes Faradaic efficiencies, total gas FE and CO single pass conversion for a table of peak integrals.
+
+    Every row is independent, so this can be applied to just the new rows of an incremental workup
+    (see stream_FE) instead of recomputing the whole table. The input is not modified.
+
+    Args:
+        peaks (pd.DataFrame): rows of handle_GC_data, update_GC_data or watch_GC_data
+        current_mA (int, optional): Current passed during step. Defaults to 200.
+        calibrations (pd.Series or dict, optional): gas to mA per unit peak area. Defaults to FE_CALIBRATIONS.
+        times (array, optional): injection times, either datetimes or hours. Defaults to None, which uses
+            a 'timestamp' column if peaks has one, and otherwise the row index times interval.
+        start (datetime, optional): time zero for datetime times. Defaults to the first time in this table.
+        interval (float, optional): hours between injections when no times are given. Defaults to 0.15.
+        CO_flow_rate, total_flow_rate (float, optional): see GC_CO_SPC. CO SPC is skipped if CO_flow_rate is None.
+        products (tuple, optional): gases summed into Total Gas FE/%. CO is the reactant, so it is left out even
+            when it has a calibration. Defaults to ('H2', 'CH4', 'C2H4').
+
+    Returns:
+        pd.DataFrame: t/h, '<gas> FE/%' for every calibrated gas, Total Gas FE/% of the products and CO SPC,
+        with the index of peaks
+    """
+    calibrations = pd.Series(calibrations)
+    gases = [gas for gas in calibrations.index if gas in peaks.columns]
+    fe = peaks[gases].astype(float) * calibrations[gases] / current_mA * 100
+    fe.columns = [gas + ' FE/%' for gas in gases]
+    
+    if times is None and 'timestamp' in peaks.columns:
+        times = peaks['timestamp']
+    if times is None:
+        hours = np.asarray(peaks.index, dtype=float) * interval
+    else:
+        times = pd.Series(np.asarray(times), index=peaks.index)
+        if pd.api.types.is_datetime64_any_dtype(times):
+            start = times.iloc[0] if start is None else pd.Timestamp(start)
+            hours = (times - start) / pd.Timedelta(hours=1)
+        else:
+            hours = times.astype(float)
+    
+    fe.insert(0, 't/h', hours)
+    fe['Total Gas FE/%'] = fe[[gas + ' FE/%' for gas in products if gas in gases]].fillna(0).sum(axis=1)
+    if 'CO' in peaks.columns and CO_flow_rate is not None:
+        fe['CO SPC'] = GC_CO_SPC(peaks, CO_flow_rate, total_flow_rate)
+    return fe
+
+
+def stream_FE(batches, current_mA=200, calibrations=FE_CALIBRATIONS, interval: float=0.15,
+              CO_flow_rate: float=1, total_flow_rate: float=20, products=('H2', 'CH4', 'C2H4')):
+    """Applies compute_FE to peak rows as they are produced, e.g. stream_FE(watch_GC_data(...)).
+
+    Args:
+        batches (iterable): DataFrames of new rows (indexed by position in the run, or with a 'timestamp' column),
+            or single rows as dicts / Series
+        current_mA ... products: see compute_FE. Timestamps are measured from the first row of the stream.
+
+    Yields:
+        pd.DataFrame: compute_FE output for each batch
+    """
+    start = None
+    for batch in batches:
+        if isinstance(batch, (dict, pd.Series)):
+            batch = pd.DataFrame([batch])
+        if start is None and 'timestamp' in batch.columns and len(batch) > 0:
+            start = batch['timestamp'].iloc[0]
+        yield compute_FE(batch, current_mA, calibrations, start=start, interval=interval,
+                         CO_flow_rate=CO_flow_rate, total_flow_rate=total_flow_rate, products=products)
+
+
+def plot_FE(df, current_mA=200, methane: bool=True, total_gas: bool=True, ax=None, calibrations=FE_CALIBRATIONS,
+            times=None, interval: float=0.15, products=('H2', 'CH4', 'C2H4')):
     """Plot Faradaic Effiencies
         Args:
-        df (DataFrame): df returned by handle_GC_data
+        df (DataFrame): df returned by handle_GC_data, or a table already returned by compute_FE
         current_mA (int, optional): Current passed during step. Defaults to 200.
+        ax (optional): existing axes to clear and redraw on. Defaults to None (new figure).
+        calibrations, times, interval, products (optional): see compute_FE
         
     Returns:
         fig, ax (tuple): fig and ax used for plotting
     """
-    
-    # Calibrations March 2022
-    # Calibrations = mA per mL GC fire / peak area per mL GC fire
-    calibrations = {'C2H4': 57.7531642857143 / 2019566.04657302,
-                    'CH4': 4.16953035714286 / 141990.386115765,
-                    'H2': -14.1597480654762 / 34959.0238571043,
-                    'CO': 0 / 715060.1018}
-    
-    # Fix notebook cell rerunning key error
-    if 'H2 FE/%' not in list(df.columns):
-        for col in df:
-            df[str(col) + ' FE/%'] = df[col] * calibrations[str(col)] / current_mA * 100
+    if 'Total Gas FE/%' in df.columns:
+        fe = df
+    else:
+        fe = compute_FE(df, current_mA, calibrations, times=times, interval=interval, CO_flow_rate=None,
+                        products=products)
 
-    fig, ax = plt.subplots(figsize = (8, 3))
+    import matplotlib.pyplot as plt
+    if ax is None:
+        fig, ax = plt.subplots(figsize = (8, 3))
+    else:
+        fig = ax.figure
+        ax.clear()
     if plt.rcParams['axes.facecolor'] == 'black':
         h2_color = 'w'
     else:
         h2_color = 'k'
-    ax.plot((df.index) * .15, df['H2 FE/%'], label='Hydrogen', c=h2_color)
-    ax.plot((df.index)* .15, df['C2H4 FE/%'], label='Ethylene', c='#1e81b0')
+    ax.plot(fe['t/h'], fe['H2 FE/%'], label='Hydrogen', c=h2_color)
+    ax.plot(fe['t/h'], fe['C2H4 FE/%'], label='Ethylene', c='#1e81b0')
     if methane is True:
-        ax.plot((df.index) * .15, df['CH4 FE/%'], label='Methane', c='C1')
+        ax.plot(fe['t/h'], fe['CH4 FE/%'], label='Methane', c='C1')
     if total_gas is True:
-        ax.plot((df.index) * .15, df['CH4 FE/%'].replace(np.nan, 0) + df['C2H4 FE/%'].replace(np.nan, 0) + df['H2 FE/%'].replace(np.nan, 0), label='Total Gas', c='C2')
+        ax.plot(fe['t/h'], fe['Total Gas FE/%'], label='Total Gas', c='C2')
     ax.set_xlabel('$t$ / h')
     ax.set_ylabel('Faradaic Efficiency / %')
     ax.set_ylim(0, 100)
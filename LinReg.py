@@ -52,6 +52,83 @@ class PolyReg:
         return np.polyval(self.coef, x)
     
     
+class PolyRegBatch:
+    """
+    PolyReg for many series at once: the same degree polynomial is fit to every row of ydata with one least squares solve.
+    
+    If xdata is 1D it is shared by all series and a single QR factorization of its Vandermonde matrix is used for all of them.
+    If xdata is 2D (one row per series) the factorizations are done as one stacked QR.
+    Attributes have the same meaning as in PolyReg, with one row (or entry) per series:
+    coef = (series, degree + 1) ndarray of fitting parameters in order of decreasing degree
+    cov = (series, degree + 1, degree + 1) ndarray of covariance matrices, scaled like np.polyfit(..., cov=True)
+    std_err, ss_res, ss_yy, ss_xx, ss_xy, r_squared, s_y = one value per series
+    """
+    def __init__(self, xdata, ydata, degree: int):
+        """
+        :param xdata: Array of xdata, shape (points,) shared by all series or (series, points)
+        :param ydata: Array of ydata, shape (series, points)
+        :param degree: Degree of polynomial fit
+        """
+        self.xdata = np.asarray(xdata, dtype=float)
+        self.ydata = np.atleast_2d(np.asarray(ydata, dtype=float))
+        self.degree = degree
+        n = self.ydata.shape[1]
+        
+        # Vandermonde columns are scaled to unit norm before factorizing, as np.polyfit does, for conditioning
+        vander = self.xdata[..., np.newaxis] ** np.arange(degree, -1, -1)
+        scale = np.sqrt((vander**2).sum(axis=-2, keepdims=True))
+        q, r = np.linalg.qr(vander / scale)
+        r_inv = np.linalg.inv(r)
+        if self.xdata.ndim == 1:
+            self.coef = (r_inv @ (q.T @ self.ydata.T)).T / scale
+        else:
+            self.coef = (r_inv @ (np.swapaxes(q, -1, -2) @ self.ydata[..., np.newaxis]))[..., 0] / scale[:, 0]
+        self.residuals = self.ydata - self.eval(self.xdata)
+        self.ss_res = np.sum(self.residuals**2, axis=1)
+        
+        # inv(V^T V) from R, then np.polyfit's scaling by ss_res / (n - degree - 1)
+        unscaled = (r_inv @ np.swapaxes(r_inv, -1, -2)) / (np.swapaxes(scale, -1, -2) * scale)
+        self.cov = unscaled * (self.ss_res / (n - degree - 1))[:, np.newaxis, np.newaxis]
+        self.std_err = np.sqrt(np.diagonal(self.cov, axis1=1, axis2=2))
+        
+        y_dev = self.ydata - self.ydata.mean(axis=1, keepdims=True)
+        x_dev = self.xdata - self.xdata.mean(axis=-1, keepdims=True)
+        self.ss_yy = np.sum(y_dev**2, axis=1)
+        self.ss_xx = np.broadcast_to(np.sum(x_dev**2, axis=-1), self.ss_yy.shape)
+        self.ss_xy = np.sum(x_dev*y_dev, axis=1)
+        self.r_squared = 1 - (self.ss_res / self.ss_yy)
+        self.s_y = np.sqrt(self.ss_res / (n - 1 - self.degree))
+    
+    def __len__(self):
+        return len(self.coef)
+    
+    @property
+    def roots(self):
+        return [np.roots(coef) for coef in self.coef]
+        
+    def report(self):
+        '''
+        Returns some quantities of interest, one row per series with the same columns as PolyReg.report()
+        '''
+        params = {}
+        for i in range(self.coef.shape[1]):
+            params['coef_deg' + str(self.coef.shape[1] - i -1)] = self.coef[:, i]
+            params['std_err_deg' + str(self.coef.shape[1] - i -1)] = self.std_err[:, i]
+            
+        params['r_squared'] = self.r_squared
+        params['s_y'] = self.s_y
+        return pd.DataFrame(params)
+    
+    def eval(self, x):
+        '''
+        Evaluates every fit at x, shape (points,) or (series, points). Returns (series, points)
+        '''
+        vander = np.asarray(x, dtype=float)[..., np.newaxis] ** np.arange(self.degree, -1, -1)
+        if vander.ndim == 2:
+            return self.coef @ vander.T
+        return (vander @ self.coef[..., np.newaxis])[..., 0]
+    
+    
 class LinFixB:
     """Linear regression class similar to PolyReg, but with degree = 0 and the y-intercept (b) fixed at 0
     """
@@ -4,30 +4,23 @@ import numpy as np
 import matplotlib.pyplot as plt
 import scipy.optimize as opt
 import scipy.stats as stats
-from importer_snippets_2020 import make_ELISA_dataframe
+from importer_snippets_2020 import read_ELISA_plates, ELISA_ROWS
 import LinReg
 import statsmodels.api as sm
 
 # Get some test data
 data_path = r'notebooks/testdata_02192021_rhMMP9.txt'  # Used Scan 2
-with open(data_path) as file:
-    lines = file.readlines()
-    lines.pop(0)
-    n = int((len(lines)) / 11)
-    output_dataframes = []
-    for i in range(n):
-        df = make_ELISA_dataframe(lines[11 * i:11 * i + 8])
-        output_dataframes.append(df)
+plates = read_ELISA_plates(data_path)
 
 # Choose scan to use and do background subtraction
-raw = output_dataframes[1].iloc[0:8, 0:8]
+raw = pd.DataFrame(plates[1], index=ELISA_ROWS, columns=range(1, 13)).iloc[0:8, 0:8]
 sub = raw.iloc[0:6, 0:8].sub(raw.iloc[6:8, 0:8].mean(axis=1).mean(axis=0))
 
 # Reshape s.t. rows are replicants, the typical quadruplicant layout is below
 reshape = sub.iloc[:, 4:8].rename(
     index={'A': 'I', 'B': 'J', 'C': 'K', 'D': 'L', 'E': 'M', 'F': 'N'},
     columns={5: 1, 6: 2, 7: 3, 8: 4})
-data = sub.iloc[:, 0:4].append(reshape)
+data = pd.concat([sub.iloc[:, 0:4], reshape])
 
 # Run stats
 data['Mean'] = data.iloc[:,0:4].mean(axis=1)
@@ -42,7 +35,7 @@ def grubbs_filter(data):
     This will be necessary, needs to replace any singular outlier with NaN
     """
     # the outlier I happen to have already found, write a real function!
-    data.iloc[2, 3] = np.NaN
+    data.iloc[2, 3] = np.nan
     return data
 
 
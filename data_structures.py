@@ -1,14 +1,187 @@
 '''
 objects to hold experiments
 '''
-import tkinter as tk
 import pandas as pd
-from tkinter import filedialog
 import time, datetime
 import os
+import re
+import json
+import sqlite3
+from contextlib import closing
+
+Tk = None
+
+
+def tk_dialogs():
+    '''
+    :return: tkinter module, with filedialog and messagebox imported
+
+    Imports tkinter and creates the hidden root window the first time a dialog is needed,
+    so that importing these modules works without a display.
+    '''
+    global Tk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    if Tk is None:
+        Tk = tk.Tk()
+        Tk.withdraw()
+    return tk
+
+
+def _split_complex(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Parquet has no complex dtype, so each complex column c (e.g. Zcx/ohm) is stored as c.real and c.imag
+    '''
+    complex_cols = [col for col in df.columns if pd.api.types.is_complex_dtype(df[col])]
+    if not complex_cols:
+        return df
+    df = df.copy()
+    for col in complex_cols:
+        loc = df.columns.get_loc(col)
+        values = df.pop(col).to_numpy()
+        df.insert(loc, str(col) + '.imag', values.imag)
+        df.insert(loc, str(col) + '.real', values.real)
+    return df
+
+
+def _merge_complex(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Reverses _split_complex
+    '''
+    for col in [col[:-5] for col in df.columns if isinstance(col, str) and col.endswith('.real')]:
+        if col + '.imag' in df.columns:
+            loc = df.columns.get_loc(col + '.real')
+            values = df.pop(col + '.real').to_numpy() + 1j*df.pop(col + '.imag').to_numpy()
+            df.insert(loc, col, values)
+    return df
+
+
+def read_parquet_frame(filepath: str, columns: list = None, memory_map: bool = False) -> pd.DataFrame:
+    '''
+    :param filepath: .parquet file written by experiment.to_parquet
+    :param columns: Optional list of columns to read. Complex columns can be asked for by their own name.
+    :param memory_map: Memory-map the file instead of reading it into a buffer first.
+    :return: Dataframe, with complex columns reassembled
+
+    Reads one frame of an experiment saved with experiment.to_parquet. Requires pyarrow.
+    '''
+    if columns is not None:
+        import pyarrow.parquet as pq
+        stored = pq.read_schema(filepath).names
+        columns = [part for col in columns
+                   for part in ([col] if col in stored else [col + '.real', col + '.imag'])]
+    return _merge_complex(pd.read_parquet(filepath, engine='pyarrow', columns=columns, memory_map=memory_map))
+
+
+def read_experiment_parquet(dirname: str, columns: list = None, opt: bool = True):
+    '''
+    :param dirname: Directory written by experiment.to_parquet
+    :param columns: Optional list of columns to read from data. params and opt frames are always read whole.
+    :param opt: Whether to read the opt frames.
+    :return: experiment object
+    '''
+    data = read_parquet_frame(dirname + '/data.parquet', columns)
+    params = read_parquet_frame(dirname + '/params.parquet')
+    opt_frames = None
+    if opt:
+        filenames = [file for file in os.listdir(dirname) if file.startswith('opt') and file.endswith('.parquet')]
+        if filenames:
+            filenames.sort(key=lambda file: int(file[3:-8]))
+            opt_frames = [read_parquet_frame(dirname + '/' + file) for file in filenames]
+    return experiment(data, params, opt_frames)
+
+
+_CATALOG_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS experiments (path TEXT PRIMARY KEY, filetype TEXT, saved TEXT, technique TEXT,
+                                        rows INTEGER, columns TEXT, params TEXT);
+CREATE TABLE IF NOT EXISTS params (path TEXT, name TEXT, value, PRIMARY KEY (path, name));
+CREATE INDEX IF NOT EXISTS params_name_value ON params (name, value);
+CREATE INDEX IF NOT EXISTS experiments_technique ON experiments (technique);
+'''
+
+
+def _param_items(params: pd.DataFrame) -> dict:
+    '''
+    Flattens params to {name: value}: column names for a single row, index names for a single column,
+    otherwise column[index]
+    '''
+    if len(params) == 1:
+        items = {str(col): params[col].iloc[0] for col in params.columns}
+    elif len(params.columns) == 1:
+        items = {str(idx): value for idx, value in params.iloc[:, 0].items()}
+    else:
+        items = {str(col) + '[' + str(idx) + ']': value for (idx, col), value in params.stack().items()}
+    # numpy scalars to python values sqlite understands
+    return {name: (value.item() if hasattr(value, 'item') else value) for name, value in items.items()}
+
+
+def _technique(exp, params: dict) -> str:
+    header = exp.data.attrs.get('header', {})
+    for key in ['technique', 'TAG']:
+        if key in header:
+            return str(header[key])
+    for name, value in params.items():
+        if name.lower() == 'technique':
+            return str(value)
+    return None
+
+
+def catalog_experiment(catalog: str, path: str, exp, filetype: str):
+    '''
+    :param catalog: SQLite file holding the catalog. Created if it does not exist.
+    :param path: Where the experiment was saved (directory, or .xlsx file).
+    :param exp: experiment object that was saved there
+    :param filetype: .xlsx, .csv or .parquet
+    :return: No return statements
+
+    Adds (or replaces) one saved experiment in the catalog: its params, data shape and columns, technique and
+    save time, so that query_catalog can find it without opening any data file.
+    '''
+    params = _param_items(exp.params)
+    with closing(sqlite3.connect(catalog)) as con, con:
+        con.executescript(_CATALOG_SCHEMA)
+        con.execute('INSERT OR REPLACE INTO experiments VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (os.path.abspath(path), filetype, datetime.datetime.now().isoformat(timespec='seconds'),
+                     _technique(exp, params), len(exp.data), json.dumps([str(col) for col in exp.data.columns]),
+                     json.dumps(params, default=str)))
+        con.execute('DELETE FROM params WHERE path = ?', (os.path.abspath(path),))
+        con.executemany('INSERT INTO params VALUES (?, ?, ?)',
+                        [(os.path.abspath(path), name, value if isinstance(value, (int, float, str)) else str(value))
+                         for name, value in params.items()])
+
+
+def query_catalog(catalog: str, technique: str = None, columns: list = None, min_rows: int = None,
+                  since: str = None, until: str = None, **params) -> pd.DataFrame:
+    '''
+    :param catalog: SQLite file written by catalog_experiment (or the catalog= option of the save methods)
+    :param technique: Only experiments of this technique
+    :param columns: Only experiments whose data has all of these columns
+    :param min_rows: Only experiments with at least this many data rows
+    :param since: Only experiments saved at or after this ISO timestamp, e.g. '2024-01-31'
+    :param until: Only experiments saved before this ISO timestamp
+    :param params: Only experiments with these param values, e.g. query_catalog(cat, current_mA=200)
+    :return: Dataframe of matching experiments, one row per saved experiment, indexed by path
+
+    Searches the catalog without opening any data file. Load a result with load_experiment or lazy_experiment.
+    '''
+    where, args = [], []
+    for clause, value in [('technique = ?', technique), ('rows >= ?', min_rows),
+                          ('saved >= ?', since), ('saved < ?', until)]:
+        if value is not None:
+            where.append(clause)
+            args.append(value)
+    for name, value in params.items():
+        where.append('path IN (SELECT path FROM params WHERE name = ? AND value = ?)')
+        args += [name, value]
+    query = 'SELECT * FROM experiments' + (' WHERE ' + ' AND '.join(where) if where else '')
+    with closing(sqlite3.connect(catalog)) as con:
+        found = pd.read_sql_query(query, con, params=args, index_col='path')
+    found['columns'] = found['columns'].map(json.loads)
+    found['params'] = found['params'].map(json.loads)
+    if columns is not None:
+        found = found[found['columns'].map(lambda cols: set(map(str, columns)).issubset(cols))]
+    return found
 
-Tk = tk.Tk()
-Tk.withdraw()
 
 class experiment:
     def __init__(self, data: pd.DataFrame, params: pd.DataFrame, opt=None):
@@ -35,17 +208,18 @@ class experiment:
     def opt(self):
         return self.opt
 
-    def to_excel(self, filepath: str = None):
+    def to_excel(self, filepath: str = None, catalog: str = None):
         """
         :param filepath: String of .xlsx file name.
+        :param catalog: Optional SQLite catalog file in which to index the saved experiment (see query_catalog).
         :return: No return statements
 
         Save experiment object to a single .xlsx file.
         WARNING: There are size and read/write speed limitations inherent to .xlsx.
         """
         if filepath is None:
-            filepath = filedialog.asksaveasfile(mode='wb', filetypes=[('Excel Worksheet', '.xlsx')],
-                                                defaultextension='.xlsx')
+            filepath = tk_dialogs().filedialog.asksaveasfile(mode='wb', filetypes=[('Excel Worksheet', '.xlsx')],
+                                                             defaultextension='.xlsx')
             with filepath as f:
                 filepath = f.name
         else:
@@ -59,17 +233,20 @@ class experiment:
             if self.opt is not None:
                 for i in range(len(self.opt)):
                     self.opt[i].to_excel(writer, engine='openpyxl', sheet_name='opt'+str(i))
+        if catalog is not None:
+            catalog_experiment(catalog, filepath, self, '.xlsx')
 
-    def to_csv(self, parentdir: str = None, dirname: str = None):
+    def to_csv(self, parentdir: str = None, dirname: str = None, catalog: str = None):
         """
         :param parentdir: Parent directory to which to save directory of CSVs.
         :param dirname: Name of directory of CSVs.
+        :param catalog: Optional SQLite catalog file in which to index the saved experiment (see query_catalog).
         :return: No return statements
 
         Creates a new directory in the selected directory
         """
         if parentdir is None:
-            parentdir = filedialog.askdirectory(title='Select the Parent Directory')
+            parentdir = tk_dialogs().filedialog.askdirectory(title='Select the Parent Directory')
         if dirname is None:
             ts = time.time()
             dirname = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
@@ -81,3 +258,120 @@ class experiment:
         if self.opt is not None:
             for i in range(len(self.opt)):
                 self.opt[i].to_csv(parentdir + '/' + dirname + '/opt' + str(i) + '.csv')
+        if catalog is not None:
+            catalog_experiment(catalog, parentdir + '/' + dirname, self, '.csv')
+
+    def to_parquet(self, parentdir: str = None, dirname: str = None, compression: str = 'snappy',
+                   catalog: str = None):
+        """
+        :param parentdir: Parent directory to which to save directory of .parquet files.
+        :param dirname: Name of directory of .parquet files.
+        :param compression: Parquet compression codec ('snappy', 'gzip', 'brotli', 'zstd' or None).
+        :param catalog: Optional SQLite catalog file in which to index the saved experiment (see query_catalog).
+        :return: No return statements
+
+        Creates a new directory in the selected directory, laid out like to_csv (data, params, opt0, ...).
+        Parquet keeps dtypes and is much faster and smaller than .xlsx or .csv for large data.
+        Complex columns are stored as <column>.real and <column>.imag and reassembled by read_experiment_parquet.
+        Requires pyarrow.
+        """
+        if parentdir is None:
+            parentdir = tk_dialogs().filedialog.askdirectory(title='Select the Parent Directory')
+        if dirname is None:
+            ts = time.time()
+            dirname = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+
+        os.mkdir(parentdir + '/' + dirname)
+
+        _split_complex(self.data).to_parquet(parentdir + '/' + dirname + '/data.parquet',
+                                             engine='pyarrow', compression=compression)
+        _split_complex(self.params).to_parquet(parentdir + '/' + dirname + '/params.parquet',
+                                               engine='pyarrow', compression=compression)
+        if self.opt is not None:
+            for i in range(len(self.opt)):
+                _split_complex(self.opt[i]).to_parquet(parentdir + '/' + dirname + '/opt' + str(i) + '.parquet',
+                                                       engine='pyarrow', compression=compression)
+        if catalog is not None:
+            catalog_experiment(catalog, parentdir + '/' + dirname, self, '.parquet')
+
+
+class _lazy_frames:
+    '''
+    List-like stand-in for experiment.opt that loads each frame on first access
+    '''
+    def __init__(self, exp, names):
+        self._exp = exp
+        self._names = names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, i):
+        return self._exp._load(self._names[i])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class lazy_experiment(experiment):
+    def __init__(self, dirname: str, columns: list = None, memory_map: bool = True):
+        '''
+        :param dirname: Directory written by experiment.to_parquet or experiment.to_csv
+        :param columns: Optional list of columns of data to load; None loads all.
+        :param memory_map: Memory-map .parquet files when loading them.
+
+        Experiment whose data, params and opt[i] are only read from disk the first time they are used.
+        Loaded frames are kept until release() is called. Saving with to_csv/to_excel/to_parquet loads everything.
+        '''
+        self.dirname = dirname
+        self.columns = columns
+        self.memory_map = memory_map
+        self.filetype = '.parquet' if os.path.exists(dirname + '/data.parquet') else '.csv'
+        self._frames = {}
+        numbers = [int(match.group(1)) for match in
+                   (re.fullmatch(r'opt(\d+)' + re.escape(self.filetype), file) for file in os.listdir(dirname))
+                   if match]
+        self._opt = _lazy_frames(self, ['opt' + str(i) for i in sorted(numbers)]) if numbers else None
+
+    def _load(self, name: str) -> pd.DataFrame:
+        if name not in self._frames:
+            filepath = self.dirname + '/' + name + self.filetype
+            columns = self.columns if name == 'data' else None
+            if self.filetype == '.parquet':
+                df = read_parquet_frame(filepath, columns, self.memory_map)
+            else:
+                df = pd.read_csv(filepath, index_col=0)
+                if columns is not None:
+                    df = df[columns]
+            self._frames[name] = df
+        return self._frames[name]
+
+    @property
+    def data(self):
+        return self._load('data')
+
+    @property
+    def params(self):
+        return self._load('params')
+
+    @property
+    def opt(self):
+        return self._opt
+
+    def loaded(self) -> list:
+        '''
+        :return: Names of the frames currently held in memory
+        '''
+        return list(self._frames)
+
+    def release(self, name: str = None):
+        '''
+        :param name: Frame to drop from memory ('data', 'params', 'opt0', ...). None drops all of them.
+        :return: No return statements
+
+        Frees loaded frames; they are read again from disk on next access.
+        '''
+        if name is None:
+            self._frames.clear()
+        else:
+            self._frames.pop(name, None)
@@ -1,16 +1,15 @@
 import pandas as pd
 import numpy as np
-import tkinter as tk
-from tkinter import filedialog
-from data_structures import experiment
+from data_structures import experiment, lazy_experiment, tk_dialogs, read_experiment_parquet
 import os
-
-Tk = tk.Tk()
-Tk.withdraw()
+import io
+import re
+import glob
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 
 def ask_path():
-    return filedialog.asksaveasfile(mode='w').name
+    return tk_dialogs().filedialog.asksaveasfile(mode='w').name
 
 
 def df_to_excel(df, sheet_name='Sheet1'):
@@ -18,8 +17,8 @@ def df_to_excel(df, sheet_name='Sheet1'):
     Uses pandas to always return a .xlsx file of the given df
     Giving the save name a file extension results in multiple files being saved
     '''
-    where = filedialog.asksaveasfile(mode='wb', filetypes=[('Microsoft Excel Worksheet', '.xlsx')],
-                                     defaultextension='.xlsx')
+    where = tk_dialogs().filedialog.asksaveasfile(mode='wb', filetypes=[('Microsoft Excel Worksheet', '.xlsx')],
+                                                  defaultextension='.xlsx')
     save_name = where.name
     if save_name[-5:] != '.xlsx':
         save_name = str(save_name + '.xlsx')
@@ -39,18 +38,23 @@ def cary630(filename):
     return df
 
 
-def load_experiment(filetype: str = '.csv', csv_dirname: str = None) -> experiment:
+def load_experiment(filetype: str = '.csv', csv_dirname: str = None, columns: list = None, lazy: bool = False) -> experiment:
     '''
-    :param filetype: .xlsx or .csv
+    :param filetype: .xlsx, .csv or .parquet
+    :param csv_dirname: Directory of CSV or .parquet files. Asked for with a dialog if None.
+    :param columns: .parquet only. Columns of data to read; None reads all.
+    :param lazy: .csv or .parquet only. Return a lazy_experiment, which reads each frame on first access.
     :return: experiment object
 
     Creates an experiment object for a previously exported experiment.
     If filetype = .xlsx, the excel file must have sheets named 'data' and 'params'
 
     If filetype = .csv, two CSVs in the selected folder must be named 'data' and 'params', respecitively
+
+    If filetype = .parquet, the folder must have been written by experiment.to_parquet
     '''
     if filetype == '.xlsx':
-        file = filedialog.askopenfilename(filetypes=[('Excel Worksheet', '.xlsx')])
+        file = tk_dialogs().filedialog.askopenfilename(filetypes=[('Excel Worksheet', '.xlsx')])
         x = pd.ExcelFile(file, engine='openpyxl')
         sheets = {}
         for sheet in x.sheet_names:
@@ -70,9 +74,11 @@ def load_experiment(filetype: str = '.csv', csv_dirname: str = None) -> experime
         return exp
     elif filetype == '.csv':
         if csv_dirname is None:
-            dirname = filedialog.askdirectory(title='Select a folder of CSV files')
+            dirname = tk_dialogs().filedialog.askdirectory(title='Select a folder of CSV files')
         else:
             dirname = csv_dirname
+        if lazy:
+            return lazy_experiment(dirname)
         filenames = os.listdir(dirname)
 
         data = pd.read_csv(dirname+'/data.csv', index_col=0)
@@ -87,45 +93,31 @@ def load_experiment(filetype: str = '.csv', csv_dirname: str = None) -> experime
                 )
         exp = experiment(data, params, opt)
         return exp
+    elif filetype == '.parquet':
+        if csv_dirname is None:
+            csv_dirname = tk_dialogs().filedialog.askdirectory(title='Select a folder of .parquet files')
+        if lazy:
+            return lazy_experiment(csv_dirname, columns)
+        return read_experiment_parquet(csv_dirname, columns)
 
 
-def biologic_mpt(path: str, technique: str=None, area: float=None) -> pd.DataFrame:
-    """
-    Should work for all .mpt files, tested on CV, CVA, CA, PEIS, ZIR.
-    
-    In principle, one function could be written with options to resort columns in various ways.
-    impedance.py includes an impedance importer, so could use that one
-
-    Args:
-        path (str): Path to .mpt file
-        technique (str, optional): Technique type. Defaults to None.
-        area (float, optional): Electrode area for normalization in cm2. Defaults to None.
+def _mpt_header(path: str):
+    """Reads only the header of a .mpt file
 
     Returns:
-        pd.DataFrame: dataframe of all data, sorted with relevant columns first when applicable
+        tuple: number of header lines and list of column names
     """
-    
     # .mpt has a variable number of header lines, but it tells you how many on line 2
     with open(path, 'r', encoding="latin-1") as input_file:
-        lines = input_file.readlines()
+        input_file.readline()
+        num_header_lines = int(input_file.readline().split(":")[1])
+        for i in range(num_header_lines - 3):
+            input_file.readline()
+        headers = input_file.readline().rstrip('\r\n').rstrip('\t').split('\t')
+    return num_header_lines, headers
 
-    header_line = lines[1]
-    num_header_lines = int(header_line.split(":")[1])
-    headers = lines[num_header_lines-1].split('\t')[0:-1]
-    data_lines = lines[num_header_lines:]
 
-    # Make a dataframe with the data
-    df = pd.DataFrame(data={}, columns=headers)
-    for i in range(len(data_lines)):
-        df.loc[len(df)] = data_lines[i].split('\t')
-        
-    # Convert text to numbers
-    for col in df.columns:
-        try:
-            df[col] = pd.to_numeric(df[col])
-        except:
-            pass
-    
+def _biologic_columns(df: pd.DataFrame, technique: str=None, area: float=None) -> pd.DataFrame:
     # Convert current to Amps (default mA) and compute current densities.
     df['<I>/A'] = df['<I>/mA'] / 1000
     
@@ -139,12 +131,62 @@ def biologic_mpt(path: str, technique: str=None, area: float=None) -> pd.DataFra
         df = df.reindex(columns=['Ewe/V', '<I>/mA', 'j/mA.cm-2', 'time/s', *aux_cols])
         
         df['cycle number'] = df['cycle number'].astype(np.int64) # Be extra sure cycle number is an integer
-        
-        
     return df
 
-def CHI_txt(path):
-    """Converts CH Instuments .txt data into pandas Datarame
+
+def _chunks(reader, process, callback=None):
+    """Iterates over a pd.read_csv chunk reader, applying the importer's column processing and an optional callback"""
+    with reader:
+        for chunk in reader:
+            chunk = process(chunk)
+            yield chunk if callback is None else callback(chunk)
+
+
+def biologic_mpt(path: str, technique: str=None, area: float=None, chunksize: int=None, callback=None):
+    """
+    Should work for all .mpt files, tested on CV, CVA, CA, PEIS, ZIR.
+    
+    In principle, one function could be written with options to resort columns in various ways.
+    impedance.py includes an impedance importer, so could use that one
+
+    Args:
+        path (str): Path to .mpt file
+        technique (str, optional): Technique type. Defaults to None.
+        area (float, optional): Electrode area for normalization in cm2. Defaults to None.
+        chunksize (int, optional): If given, return an iterator of DataFrames with chunksize rows each
+            instead of loading the whole file, for very long CA/CP files. Defaults to None.
+        callback (callable, optional): With chunksize, each chunk is passed through callback(chunk) and the iterator
+            yields its return values (e.g. running statistics or a downsampled chunk). Defaults to None.
+
+    Returns:
+        pd.DataFrame: dataframe of all data, sorted with relevant columns first when applicable
+    """
+    num_header_lines, headers = _mpt_header(path)
+
+    # The data block goes straight to pandas' C parser. Data lines may or may not end with a tab,
+    # so only the named columns are read.
+    reader = pd.read_csv(path,
+                         sep='\t',
+                         encoding='latin-1',
+                         skiprows=num_header_lines,
+                         header=None,
+                         names=headers,
+                         usecols=range(len(headers)),
+                         engine='c',
+                         chunksize=chunksize)
+    if chunksize is not None:
+        return _chunks(reader, lambda chunk: _biologic_columns(chunk, technique, area), callback)
+    return _biologic_columns(reader, technique, area)
+
+def _CHI_value(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _read_CHI(path: str) -> tuple:
+    """Reads a CH Instruments .txt file once: header lines up to the column names, then the numeric block.
 
     Args:
         path (str): path to .txt file
@@ -153,29 +195,30 @@ def CHI_txt(path):
         ValueError: if data cannot be converted to a numerical datatype
 
     Returns:
-        pd.DataFrame: Dataframe containing all data after header
+        tuple: (pd.DataFrame of all data after header, header dict with 'date', 'technique' and every
+        'Name: value' / 'Parameter (unit) = value' line of the header)
     """
-    header = []
     with open(path, 'r') as ff:
-        lines = ff.readlines()
-        # date = lines[0]
-        technique = lines[1].replace('\n', '')
-        i = 1
-        for line in lines[1:]: # First line always date with ,
-            if ',' not in line:
-                header.append(line)
-                if line != '\n': # readlines counts blank lines, but pandas does not.
-                    i += 1
-            else:
+        date = ff.readline().strip() # First line always date with ,
+        technique = ff.readline().strip()
+        header = {'date': date, 'technique': technique}
+        for line in iter(ff.readline, ''):
+            if ',' in line: # column names
                 break
-    df = pd.read_csv(path, header=i)
+            if '=' in line:
+                key, value = line.split('=', 1)
+                header[key.strip()] = _CHI_value(value.strip())
+            elif ':' in line:
+                key, value = line.split(':', 1)
+                header[key.strip()] = value.strip()
+        df = pd.read_csv(io.StringIO(line + ff.read()), engine='c')
     df.columns = df.columns.str.replace(' ', '')
     for col in df.columns:
-        try:
-            df[col] = pd.to_numeric(df[col])
-        except:
-            raise ValueError('Column could not be converted to numeric')
-    
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except:
+                raise ValueError('Column could not be converted to numeric')
     
     if technique == 'A.C. Impedance':
         df.rename({r"Z'/ohm": 'Zre/ohm', 
@@ -183,7 +226,24 @@ def CHI_txt(path):
                    r"Z/ohm": 'Zmag/ohm'}, axis=1, inplace=True)
         df['Zcx/ohm'] = df['Zre/ohm'] + 1j*df['Zim/ohm']
         df['Angular_Freq'] = df['Freq/Hz']*2*np.pi
-    return df
+    df.attrs['header'] = header
+    return df, header
+
+
+def CHI_txt(path):
+    """Converts CH Instuments .txt data into pandas Datarame
+
+    Args:
+        path (str): path to .txt file
+
+    Raises:
+        ValueError: if data cannot be converted to a numerical datatype
+
+    Returns:
+        pd.DataFrame: Dataframe containing all data after header. The parsed header (date, technique,
+        parameters) is in df.attrs['header'].
+    """
+    return _read_CHI(path)[0]
 
 
 def CHI_txt_todict(path, dict):
@@ -199,34 +259,7 @@ def CHI_txt_todict(path, dict):
     Returns:
         dict: Dictionary of dataframe with filepath keys. Dataframes contain all data after header
     """
-    header = []
-    with open(path, 'r') as ff:
-        lines = ff.readlines()
-        # date = lines[0]
-        technique = lines[1].replace('\n', '')
-        i = 1
-        for line in lines[1:]: # First line always date with ,
-            if ',' not in line:
-                header.append(line)
-                if line != '\n': # readlines counts blank lines, but pandas does not.
-                    i += 1
-            else:
-                break
-    df = pd.read_csv(path, header=i)
-    df.columns = df.columns.str.replace(' ', '')
-    for col in df.columns:
-        try:
-            df[col] = pd.to_numeric(df[col])
-        except:
-            raise ValueError('Column could not be converted to numeric')
-    
-    
-    if technique == 'A.C. Impedance':
-        df.rename({r"Z'/ohm": 'Zre/ohm', 
-                   r'Z"/ohm': 'Zim/ohm',
-                   r"Z/ohm": 'Zmag/ohm'}, axis=1, inplace=True)
-        df['Zcx/ohm'] = df['Zre/ohm'] + 1j*df['Zim/ohm']
-        df['Angular_Freq'] = df['Freq/Hz']*2*np.pi
+    df = CHI_txt(path)
     
     # remove common extension tags
     if path.lower().endswith('.txt') or path.lower().endswith('.dta'):
@@ -236,7 +269,151 @@ def CHI_txt_todict(path, dict):
     return dict
 
 
-def Gamry_dta(file: str, line_offset: int=0):
+# Gamry column names to the names used by the other importers. Columns not listed keep Gamry's name.
+_GAMRY_NAMES = {'Pt': '',
+                'T': 'Time/sec',
+                'Time': 'Time/sec',
+                'Vf': 'Potential/V',
+                'Im': 'Current/A',
+                'Vu': 'Vu/V',
+                'Vm': 'Vm/V',
+                'Temp': 'Temp/C',
+                'Freq': 'Freq/Hz',
+                'Zreal': 'Zre/ohm',
+                'Zimag': 'Zim/ohm',
+                'Zsig': 'Zsig/V',
+                'Zmod': 'Zmag/ohm',
+                'Zphz': 'Phase/deg',
+                'Idc': 'iDC/A',
+                'Vdc': 'VDC/V'}
+
+# The data tables of a .DTA file, e.g. CURVE\tTABLE\t1234, ZCURVE\tTABLE\t60, or CURVE1 ... CURVEn for the cycles of a CV.
+# Earlier tables such as OCVCURVE are skipped.
+_GAMRY_TABLE = re.compile(r'Z?CURVE(\d*)')
+_GAMRY_TABLE_END = re.compile(r'^[^\t\n]', re.MULTILINE)
+_GAMRY_NEXT_TABLE = re.compile(r'^(Z?CURVE\d*)\tTABLE[^\n]*\n([^\n]*)\n[^\n]*(?:\n|$)', re.MULTILINE)
+
+
+def _gamry_names(names_line: str) -> list:
+    return ['empty'] + [_GAMRY_NAMES.get(name, name) for name in names_line.rstrip('\n').split('\t')[1:]]
+
+
+def _gamry_header(opened_file) -> tuple:
+    """Reads a .DTA file up to the first row of its main data table
+
+    Returns:
+        tuple: header dict (KEY: VALUE, plus 'units'), the column names of the table, and the curve number of the
+        table ('1' for CURVE1, '' for an unnumbered CURVE or ZCURVE)
+    """
+    header = {}
+    for line in iter(opened_file.readline, ''):
+        fields = line.rstrip('\r\n').split('\t')
+        table = _GAMRY_TABLE.fullmatch(fields[0])
+        if len(fields) > 1 and fields[1] == 'TABLE' and table:
+            break
+        if fields[0] == '' or len(fields) < 2:
+            continue
+        value = fields[2] if len(fields) > 2 else fields[1]
+        if fields[1] in ['QUANT', 'IQUANT']:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        header[fields[0]] = value
+    else:
+        raise ValueError('No CURVE TABLE found in ' + str(opened_file.name))
+    
+    # The table starts with a line of column names and a line of units, both indented by a tab
+    names_line = opened_file.readline()
+    units = opened_file.readline().rstrip('\r\n').split('\t')[1:]
+    header['units'] = dict(zip(names_line.rstrip('\r\n').split('\t')[1:], units))
+    return header, _gamry_names(names_line), table.group(1)
+
+
+def _gamry_next_curve(file: str, table: str, names_line: str, names: list, curve: str) -> str:
+    """Checks a further data table of a .DTA file and returns its curve number
+
+    Numbered tables (CURVE1, CURVE2, ...) with the same columns as the first are read as consecutive curves.
+    Anything else would be silently dropped or misaligned, so it raises.
+    """
+    following = _GAMRY_TABLE.fullmatch(table).group(1)
+    if curve == '' or following == '':
+        raise ValueError(str(file) + ' has more than one data table (' + table + '), which Gamry_dta cannot combine')
+    if _gamry_names(names_line) != names:
+        raise ValueError(table + ' of ' + str(file) + ' has different columns than CURVE' + curve)
+    return following
+
+
+def _gamry_columns(df: pd.DataFrame, header: dict=None) -> pd.DataFrame:
+    if 'Over' in df.columns:
+        del df['Over'] # get rid of this useless, unparsable shit
+    if 'Zre/ohm' in df.columns:
+        df['Zcx/ohm'] = df['Zre/ohm'] + 1j*df['Zim/ohm']
+        df['Angular_Freq'] = df['Freq/Hz']*2*np.pi
+    if header is not None:
+        df.attrs['header'] = header
+    return df
+
+
+class _GamryTable:
+    """Text file-like view of the data rows of a .DTA file, for the chunked reader
+
+    Lines that do not start with a tab (e.g. EXPERIMENTABORTED) are skipped. Further numbered tables
+    (CURVE2, CURVE3, ...) are followed, and each of their rows is prefixed with its curve number, which fills
+    the otherwise empty first field.
+    """
+    def __init__(self, opened_file, names: list, curve: str):
+        self._file = opened_file
+        self._names = names
+        self._curve = curve
+
+    def readline(self) -> str:
+        for line in iter(self._file.readline, ''):
+            if line.startswith('\t'):
+                return self._curve + line
+            fields = line.split('\t')
+            if len(fields) > 1 and fields[1] == 'TABLE' and _GAMRY_TABLE.fullmatch(fields[0]):
+                names_line = self._file.readline()
+                self._file.readline() # units
+                self._curve = _gamry_next_curve(self._file.name, fields[0], names_line, self._names, self._curve)
+        return ''
+
+    def read(self, size: int=-1) -> str:
+        lines, length = [], 0
+        while size < 0 or length < size:
+            line = self.readline()
+            if line == '':
+                break
+            lines.append(line)
+            length += len(line)
+        return ''.join(lines)
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+
+def _gamry_curves(df: pd.DataFrame, curve: str) -> pd.DataFrame:
+    # The first field of a row is empty, or the curve number for files with CURVE1 ... CURVEn tables
+    if curve == '':
+        return df.drop(columns='empty')
+    return df.rename(columns={'empty': 'Curve'})
+
+
+def _gamry_chunks(file: str, chunksize: int, callback=None):
+    with open(file, 'r', encoding='latin-1') as opened_file:
+        header, names, curve = _gamry_header(opened_file)
+        reader = pd.read_csv(_GamryTable(opened_file, names, curve), delimiter='\t', header=None, index_col=1,
+                             names=names, chunksize=chunksize)
+        for chunk in _chunks(reader, lambda chunk: _gamry_curves(chunk, curve)):
+            # pandas infers dtypes per chunk, so an integer-valued column could be int64 in one chunk and float64
+            # in the next. Every numeric column is float64 in every chunk so streamed results can be concatenated.
+            numeric = chunk.select_dtypes('number').columns
+            chunk[numeric] = chunk[numeric].astype(np.float64)
+            chunk = _gamry_columns(chunk, header)
+            yield chunk if callback is None else callback(chunk)
+
+
+def Gamry_dta(file: str, line_offset: int=0, chunksize: int=None, callback=None):
     """Converts Gamry's .DTA file to usable format.
     
     ------------Gamry's Notation-----------------
@@ -255,64 +432,49 @@ def Gamry_dta(file: str, line_offset: int=0):
     ---------------------------------------------
     Args:
         file (str): Path to .DTA file
-        line_offset (int): Number of extra lines to skip. Negative number read earlier lines.
+        line_offset (int): Ignored. The table is now found from its CURVE TABLE header; kept so old calls still work.
+        chunksize (int, optional): If given, return an iterator of DataFrames with chunksize rows each. All numeric
+            columns are float64 in every chunk. Defaults to None.
+        callback (callable, optional): With chunksize, each chunk is passed through callback(chunk) and the iterator
+            yields its return values (e.g. running statistics or a downsampled chunk). Defaults to None.
 
     Returns:
-        pd.DataFrame: data
-    """
-    
-    # Get technique. It sits in the third line of a .DTA file.
-    # The actual text that appears here may be mutable in the experimental setup, check that if you're getting errors.
-    with open(file, 'r', errors='replace') as opened_file:
-        lines = opened_file.readlines()
-        technique = lines[2].split('\t')[2]
+        pd.DataFrame: data, with column names and units taken from the file. The header block (TAG, TITLE, DATE,
+        AREA, ..., and the units of each column) is in df.attrs['header']. Files with several numbered tables
+        (CURVE1 ... CURVEn, e.g. the cycles of a CV) are returned as one frame with a Curve column; Pt restarts
+        at 0 in each curve.
     
+    Raises:
+        ValueError: if the file has no data table, or further tables that cannot be combined with the first
+    """
+    if chunksize is not None:
+        return _gamry_chunks(file, chunksize, callback)
     
-    # Import data
-    for alias in ['chronopotentiometry scan', 'istep', 'isteps', 'chronop']:
-        if alias in technique.lower():
-            df = pd.read_csv(file, 
-                    encoding='unicode escape',
-                    delimiter='\t', 
-                    skiprows=62 + line_offset, 
-                    index_col=0, 
-                    names=['empty', '', 'Time/sec', 'Potential/V', 'Current/A', 'Vu/V', 'Sig', 'Ach', 'IERange', 'Over', 'Temp/C'], 
-                    usecols=lambda x: x != 'empty'
-                    )
-            
-            del df['Over'] # get rid of this useless, unparsable shit
-            return df
-        
-    for alias in ['open circuit potential', 'ocp', 'ocpt']:
-        if alias in technique.lower():
-            df = pd.read_csv(file, 
-                    encoding='unicode escape',
-                    delimiter='\t', 
-                    skiprows=51 + line_offset, 
-                    index_col=0, 
-                    names=['empty', '', 'Time/sec', 'Potential/V', 'Vm/V', 'Ach', 'Over', 'Temp/C'], 
-                    usecols=lambda x: x != 'empty'
-                    )
-            
-            del df['Over'] # get rid of this useless, unparsable shit
-            return df
+    # One pass over the file: the header is read line by line up to the main table, then the rest of the
+    # file is cut into its data tables and parsed with a single C-engine call.
+    with open(file, 'r', encoding='latin-1') as opened_file:
+        header, names, curve = _gamry_header(opened_file)
+        rest = opened_file.read()
+    tables, start = [], 0
+    while True:
+        end = _GAMRY_TABLE_END.search(rest, start)
+        stop = len(rest) if end is None else end.start()
+        # Rows of numbered curves get their curve number in the empty first field
+        tables.append(rest[start:stop] if curve == '' else re.sub(r'^\t', curve + '\t', rest[start:stop], flags=re.MULTILINE))
+        following = _GAMRY_NEXT_TABLE.search(rest, stop)
+        if following is None:
+            break
+        curve = _gamry_next_curve(file, following.group(1), following.group(2), names, curve)
+        start = following.end()
     
-    for alias in ['geis', 'eis']:
-        if alias in technique.lower():
-            df = pd.read_csv(file, 
-                    encoding='unicode escape',
-                    delimiter='\t', 
-                    skiprows=57 + line_offset, 
-                    index_col=0, 
-                    names=['empty', '', 'Time/sec', 'Freq/Hz', 'Zre/ohm', 'Zim/ohm', 'Zsig/V',
-                            'Zmag/ohm', 'Phase/deg', 'iDC/A', 'VDC/V', 'IERange'], 
-                    usecols=lambda x: x != 'empty'
-                    )
-            df['Zcx/ohm'] = df['Zre/ohm'] + 1j*df['Zim/ohm']
-            df['Angular_Freq'] = df['Freq/Hz']*2*np.pi
-            return df
-            
-    raise NameError(technique+' is not a recognized technique')
+    df = pd.read_csv(io.StringIO(''.join(tables)), 
+            delimiter='\t', 
+            header=None,
+            index_col=1, 
+            names=names, 
+            engine='c'
+            )
+    return _gamry_columns(_gamry_curves(df, curve), header)
 
 
 def Ecell_csv(file: str, offset=0):
@@ -331,4 +493,73 @@ def Ecell_csv(file: str, offset=0):
     df['Time/sec'] = td.dt.total_seconds()
     
     df['Time/sec'] += offset
-    return df
\ No newline at end of file
+    return df
+
+
+def _importer(path: str):
+    """Picks the importer for an electrochemistry file, from its first line if that is recognizable, else its extension"""
+    with open(path, 'r', encoding='latin-1') as opened_file:
+        first_line = opened_file.readline()
+    if first_line.startswith('EC-Lab'):
+        return biologic_mpt
+    if first_line.startswith('EXPLAIN'):
+        return Gamry_dta
+    return IMPORTERS.get(os.path.splitext(path)[1].lower())
+
+
+def _import_file(path: str):
+    importer = _importer(path)
+    if importer is None:
+        raise ValueError('No importer for ' + path)
+    return importer(path)
+
+
+# Importer used for each file extension by import_folder
+IMPORTERS = {'.txt': CHI_txt,
+             '.dta': Gamry_dta,
+             '.mpt': biologic_mpt}
+
+
+def import_folder(path: str, workers: int=None, processes: bool=False, concat: bool=False):
+    """Imports every CHI .txt, Gamry .DTA and BioLogic .mpt file in a folder in parallel.
+    
+    Each file is sent to CHI_txt, Gamry_dta or biologic_mpt based on its first line (EC-Lab / EXPLAIN) or, failing
+    that, its extension. A file that fails to parse does not stop the import; its exception is returned in errors.
+
+    Args:
+        path (str): Folder, or glob pattern such as 'EIS/*.DTA'
+        workers (int, optional): Number of parallel workers. Defaults to None (executor default, about one per core).
+        processes (bool, optional): Parse in a process pool instead of a thread pool. Parsing is mostly done in
+            pandas' C reader, so threads are usually enough. Defaults to False.
+        concat (bool, optional): Return one long DataFrame with a 'file' column instead of a dict. Defaults to False.
+
+    Returns:
+        tuple: (dict of DataFrames with filepath keys without extension, or the concatenated DataFrame;
+        dict of {filepath: exception} for files that could not be imported)
+    """
+    if os.path.isdir(path):
+        files = [file for file in glob.glob(os.path.join(path, '*')) if os.path.splitext(file)[1].lower() in IMPORTERS]
+    else:
+        files = glob.glob(path)
+    files.sort()
+    
+    Executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    data, errors = {}, {}
+    with Executor(max_workers=workers) as executor:
+        futures = {file: executor.submit(_import_file, file) for file in files}
+    for file, future in futures.items():
+        try:
+            df = future.result()
+        except Exception as error:
+            errors[file] = error
+            continue
+        # remove common extension tags, as in CHI_txt_todict
+        data[os.path.splitext(file)[0] if file.lower().endswith(('.txt', '.dta', '.mpt')) else file] = df
+    
+    if errors:
+        print(str(len(errors)) + ' of ' + str(len(files)) + ' files could not be imported')
+    if concat:
+        if not data:
+            return pd.DataFrame(), errors
+        data = pd.concat(list(data.values()), keys=list(data.keys()), names=['file']).reset_index(level=0)
+    return data, errors
@@ -1,7 +1,8 @@
 import pandas as pd
-import glob, os, time, openpyxl
-from tkinter import filedialog, messagebox
-import tkinter as tk
+import numpy as np
+import glob, os
+from concurrent.futures import ThreadPoolExecutor
+from data_structures import tk_dialogs
 
 def get_folders(folder_list=None):
     '''
@@ -9,10 +10,10 @@ def get_folders(folder_list=None):
     '''
     if folder_list == None:
         folder_list = []
-    folder_path = filedialog.askdirectory(title='Select Data Folder')
+    folder_path = tk_dialogs().filedialog.askdirectory(title='Select Data Folder')
     folder_list.append(folder_path)
-    prompt = tk.messagebox.askyesno('Data Folder Selection',
-                                    'Are there any other folders?', icon='warning')
+    prompt = tk_dialogs().messagebox.askyesno('Data Folder Selection',
+                                              'Are there any other folders?', icon='warning')
     if prompt == True:
         get_folders(folder_list)
 
@@ -40,17 +41,21 @@ def get_filename_and_extension(path):
 
 
 #Stellarnet/Spectrawiz SSM Importer
+def read_stellarnet_ssm(file):
+    """
+    Takes path to .SSM file
+    Returns (n, 2) array of wavelength, intensity
+    """
+    return pd.read_csv(file, skiprows=1, sep=r'\s+', header=None, names=['wavelength', 'intensity'],
+                       engine='c').to_numpy()
+
+
 def series_stellarnet_ssm(file):
     """
     Takes path to .SSM file and imports using pandas from_csv() to a Series
     Returns intensity data only
     """
-    df = pd.read_csv(file, skiprows=1, delim_whitespace=True, names=['wavelength', 'intensity'])
-    list = []
-    for element in df['intensity']:
-        list.append(element)
-    series = pd.Series(list)
-    return series
+    return pd.Series(read_stellarnet_ssm(file)[:, 1])
 
 
 def concat_me(DataFrame, Series, name=None):
@@ -62,25 +67,36 @@ def concat_me(DataFrame, Series, name=None):
     return pd.concat([DataFrame, Series], axis=1)
 
 
-def import_ssm_folder(folder_path):
+def import_ssm_folder(folder_path, workers=None):
     """
     Takes folder path, abstracts to get filenames list and
-    Concatenates the series representing all data
-    Returns DataFrame of folder's .SSM data
+    reads every .SSM file into one preallocated (wavelength x file) array
+    Returns DataFrame of folder's .SSM data, indexed by Wavelength with one column per file
 
-    Dependent on tkinter, glob, pandas
+    workers: number of threads reading files in parallel, None reads them one after another
+    Raises ValueError if a file does not share the wavelength axis of the first file
     """
     filenames = get_filenames_from_folder(folder_path, '.ssm')
-    basis = pd.read_csv(filenames[0],
-                        skiprows=1,
-                        delim_whitespace=True,
-                        names=['Wavelength', get_filename_and_extension(filenames[0])])
-    for file in filenames[1::1]:
-        series = series_stellarnet_ssm(file)
-        name = get_filename_and_extension(file)
-        basis = concat_me(basis, series, name)
-    basis.set_index(basis.columns[0], inplace=True)
-    return basis
+    first = read_stellarnet_ssm(filenames[0])
+    wavelength = first[:, 0]
+    intensities = np.empty((len(wavelength), len(filenames)))
+    intensities[:, 0] = first[:, 1]
+
+    def fill(i):
+        spectrum = read_stellarnet_ssm(filenames[i])
+        if spectrum.shape != first.shape or not np.array_equal(spectrum[:, 0], wavelength):
+            raise ValueError(filenames[i] + ' does not have the same wavelengths as ' + filenames[0])
+        intensities[:, i] = spectrum[:, 1]
+
+    if workers is None:
+        for i in range(1, len(filenames)):
+            fill(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill, range(1, len(filenames))))
+    return pd.DataFrame(intensities,
+                        index=pd.Index(wavelength, name='Wavelength'),
+                        columns=[get_filename_and_extension(file) for file in filenames])
 
 
 def blank_subtract(raw):
@@ -106,61 +122,105 @@ def get_params(folder_path):
 
 
 #ELISA Importer
+ELISA_ROWS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+
+
+def _ELISA_values(lines):
+    '''
+    Takes lines from the raw text file
+    Returns (n, 12) array of OD (a.u.) for the n lines holding a row label (A-H) and 12 readings like +01234
+    Other lines, including a ,1,2,...,12 column header, are skipped
+    '''
+    fields = (line.split(',', 1) for line in lines if line.count(',') == 12)
+    rows = [values for label, values in fields if label.strip() in ELISA_ROWS]
+    if not rows:
+        return np.empty((0, 12))
+    return np.loadtxt(rows, delimiter=',', ndmin=2) / 1000
+
+
 def make_ELISA_dataframe(lines):
     '''
     Takes sorted sets lines from the raw text file
     Places OD data in units of (a.u.) in dataframes that maintain the 8x12 shape (but inlcude indexes).
     '''
-    rows = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-    df = pd.DataFrame(columns=range(1, 13))
-    row_indexer = 0
-    for line in lines:
-        # print(line)
-        row_as_list = line.split(sep=',')
-        if len(row_as_list) == 13:
-            row_as_list.pop(0)
-        else:
-            continue
-            # Lines that do not contain data are directed here
-        row_dict = {}
-        column_indexer = 0
-        for value in row_as_list:
-            row_dict[column_indexer + 1] = int(value.strip('+')) / 1000
-            column_indexer += 1
-        s = pd.Series(row_dict)
-        s.name = rows[row_indexer]
-        df = df.append(s)
-        row_indexer += 1
-    return df
-
-# with open(file_path) as file:
-#     lines = file.readlines()
-#     lines.pop(0)
-#     n = int((len(lines)) / 11)
-#     output_dataframes = []
-#     for i in range(n):
-#         df = make_ELISA_dataframe(lines[11*i:11*i + 8])
-#         output_dataframes.append(df)
+    values = _ELISA_values(lines)
+    return pd.DataFrame(values, index=ELISA_ROWS[:len(values)], columns=range(1, 13))
+
+
+def read_ELISA_plates(file_path):
+    '''
+    Takes path to a plate reader text export holding one or more scans
+    Returns (scans, 8, 12) array of OD data in units of (a.u.), read in one pass
+    '''
+    with open(file_path) as file:
+        values = _ELISA_values(file)
+    if len(values) % 8:
+        raise ValueError(file_path + ' has ' + str(len(values)) + ' plate rows, not a whole number of 8-row plates')
+    return values.reshape(-1, 8, 12)
+
+
+def ELISA_long(plates):
+    '''
+    Takes (scans, 8, 12) array from read_ELISA_plates
+    Returns long-format DataFrame with one row per well and columns scan, row, column, OD
+    '''
+    scan, row, column = np.indices(plates.shape).reshape(3, -1)
+    return pd.DataFrame({'scan': scan,
+                         'row': np.array(ELISA_ROWS)[row],
+                         'column': column + 1,
+                         'OD': plates.ravel()})
 
 
 #Episodic Importers
-def episodic_to_dataframe(file):
+def episodic_array(file, dtype=np.float64):
+    '''
+    Takes .EP1x file
+    Returns wavelength array and (wavelength x episode) array of intensities, parsed in a single pass
+
+    The number of episodes is taken from the first data line by np.loadtxt itself, so the file is only read once
+    dtype: dtype of the intensities, e.g. np.float32 to halve memory. Wavelengths stay float64.
+    '''
+    data = np.loadtxt(file, ndmin=2)
+    return data[:, 0], data[:, 1:].astype(dtype, copy=False)
+
+
+def episodic_to_dataframe(file, dtype=np.float64):
     '''
     Takes .EP1x file, returns dataframe indexed by wavelength and 'epx'
     where x is the episode number
+    '''
+    wavelength, episodes = episodic_array(file, dtype)
+    return pd.DataFrame(episodes,
+                        index=pd.Index(wavelength, name='wavelength'),
+                        columns=['ep' + str(column + 1) for column in range(episodes.shape[1])])
 
-    pd.read_csv needs to know how many columns there will be before importing
-    or else it will assume the first row contains column names, not data
+
+def import_episodic_folder(folder_path, extension='.EP1*', dtype=np.float64, workers=None):
     '''
-    row = pd.read_csv(file, delim_whitespace=True, nrows=1)
-    num_episodes = len(row.columns) - 1
-    column_names = ['wavelength']
-    for column in range(num_episodes):
-        column_names.append('ep' + str(column + 1))
-    # Now it will actually be imported
-    raw = pd.read_csv(file, delim_whitespace=True, index_col=0, names=column_names)
-    # Columns are now indexed with their episode number.
-    return raw
+    Takes folder path of episodic files
+    Returns filenames, shared wavelength array and one preallocated (file x wavelength x episode) array
+
+    workers: number of threads reading files in parallel, None reads them one after another
+    Raises ValueError if a file does not match the wavelengths and episode count of the first file
+    '''
+    filenames = get_filenames_from_folder(folder_path, extension)
+    wavelength, first = episodic_array(filenames[0], dtype)
+    spectra = np.empty((len(filenames),) + first.shape, dtype=first.dtype)
+    spectra[0] = first
+
+    def fill(i):
+        file_wavelength, episodes = episodic_array(filenames[i], dtype)
+        if episodes.shape != first.shape or not np.array_equal(file_wavelength, wavelength):
+            raise ValueError(filenames[i] + ' does not have the same wavelengths and episodes as ' + filenames[0])
+        spectra[i] = episodes
+
+    if workers is None:
+        for i in range(1, len(filenames)):
+            fill(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill, range(1, len(filenames))))
+    return filenames, wavelength, spectra
 
 
 def export_dfl(df_list, params):
@@ -168,8 +228,8 @@ def export_dfl(df_list, params):
     Takes the list of [filename, df] pairs generated from legacy FRET script
     Saves each dataframe (and input params) to separate sheets in a single .xlsx file in the save location
     '''
-    save_path = filedialog.asksaveasfile(title='Select Save Location',
-                                         filetypes=[('Microsoft Excel Worksheet', '.xlsx')])
+    save_path = tk_dialogs().filedialog.asksaveasfile(title='Select Save Location',
+                                                      filetypes=[('Microsoft Excel Worksheet', '.xlsx')])
     save_name = save_path.name
     if save_name[-5:] != '.xlsx':
         save_name = str(save_name + '.xlsx')
@@ -192,8 +252,8 @@ def export_dfl_list(dfl_list, params):
 
     OPEN ISSUE: the params that is passed in does not necessarily apply to each set of spectra.
     '''
-    save_path = filedialog.asksaveasfile(title='Select Save Location',
-                                         filetypes=[('Microsoft Excel Worksheet', '.xlsx')])
+    save_path = tk_dialogs().filedialog.asksaveasfile(title='Select Save Location',
+                                                      filetypes=[('Microsoft Excel Worksheet', '.xlsx')])
     save_name = save_path.name
     if save_name[-5:] != '.xlsx':
         save_name = str(save_name + '.xlsx')
@@ -202,28 +262,26 @@ def export_dfl_list(dfl_list, params):
             dfl_list[i][-1].to_excel(writer, sheet_name='Conc' + str(i))
         params.to_excel(writer, sheet_name='params')
 
-#SET OFFSET HERE IN SECONDS
-def get_times(params, episodes):
+def get_times(params, episodes, offset=15, as_timedelta=False):
     '''
-    Returns a list of times, marking the start of each collection period
-    Times are strictly in seconds
+    Returns an array of times, marking the start of each collection period
+    Times are strictly in seconds, truncated to whole seconds
+    offset: seconds before the first episode starts
+    as_timedelta: return timedelta64[s] values instead of ints, e.g. for a TimedeltaIndex
     '''
     collection_period = params['scans_avg'] * (int(params['int_time']) / 1000)
     delay = ((int(params['min_delay']) * 60) + (int(params['ms_delay']) / 1000))
-    times = []
-    for ep in range(episodes):
-        times.append(
-            int(ep * (collection_period + delay) + 15) #SET OFFSET HERE IN SECONDS
-        )
+    times = (np.arange(episodes) * (collection_period + delay) + offset).astype(np.int64)
+    if as_timedelta:
+        return times.astype('timedelta64[s]')
     return times
 
 
 def convert_times(list):
     '''
-    Takes list of times in seconds
-    Returns list of times in more readable H:M:S format
+    Takes list or array of times in seconds
+    Returns array of times in more readable H:M:S format
     '''
-    time_codes = []
-    for i in list:
-        time_codes.append(time.strftime("%H:%M:%S", time.gmtime(i)))
-    return time_codes
\ No newline at end of file
+    seconds = np.floor(np.asarray(list, dtype=np.float64)).astype(np.int64)
+    hms = [np.char.zfill(part.astype(str), 2) for part in [seconds // 3600 % 24, seconds // 60 % 60, seconds % 60]]
+    return np.char.add(np.char.add(np.char.add(hms[0], ':'), np.char.add(hms[1], ':')), hms[2])
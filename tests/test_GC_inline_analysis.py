@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import GC_inline_analysis as GC
+
+
+def _write_injection(folder, run, scale, rng):
+    """Writes a 9 minute FID/TCD pair with overlapping CO and CH4 peaks, C2H4 and a (negative) H2 TCD peak"""
+    t = np.arange(0, 540, 0.2)
+    def peak(center, height, width):
+        return height * np.exp(-0.5 * ((t - center) / width)**2)
+    fid = 1000 + peak(200, 40000 * scale, 3) + peak(235, 90000 * scale, 4) + peak(490, 60000, 5)
+    tcd = 5000 - peak(97, 30000 * scale, 1.5)
+    files = {}
+    for detector, signal in [('FID', fid), ('TCD', tcd)]:
+        path = folder / ('RUN' + detector + '%02d.ASC' % run)
+        header = ''.join('Header line %d\n' % i for i in range(25))
+        values = np.round(signal + rng.normal(0, 2, t.size)).astype(int)
+        path.write_text(header + ''.join('%d,%d\n' % (v, v) for v in values))
+        files[detector] = str(path)
+    return files
+
+
+@pytest.mark.parametrize('run, scale', list(enumerate([0.5, 0.8, 1, 1.3, 2], start=1)))
+def test_integrate_peaks_matches_integrate_peak(tmp_path, run, scale):
+    # integrate_peaks fits every window separately, so it must agree with the one-peak functions to rounding error
+    files = _write_injection(tmp_path, run, scale, np.random.default_rng(run))
+    peaks = GC.integrate_peaks(files, smooth=10)
+    for gas, row in GC.GC_PEAKS_9MIN.iterrows():
+        if row['detector'] == 'FID':
+            expected = GC.integrate_peak(files['FID'], row['left'], row['right'], 25, row['thresh'], 10, gas,
+                                         suppress_outputs=True)
+        else:
+            expected = -GC.integrate_TCD_peak(files['TCD'], row['left'], row['right'], 25, row['thresh'], 10,
+                                              suppress_outputs=True)
+        assert peaks.loc[gas, 'integral'] == pytest.approx(expected, rel=1e-9, nan_ok=True)
+    assert peaks.loc['CO', 'integral'] > 0
+
+
+def test_handle_GC_data_peak_table(tmp_path):
+    # the folder pipeline reads its windows from the peak table, so extra rows become extra columns
+    for run, scale in enumerate([0.5, 1, 2], start=1):
+        _write_injection(tmp_path, run, scale, np.random.default_rng(run))
+    windows = [180, 220, 280, 200, 250, 1000, 460, 520, 1000, 90, 105, -2500]
+    positional = GC.handle_GC_data(str(tmp_path), *windows, 10, suppress_outputs=True)
+    default = GC.handle_GC_data(str(tmp_path), suppress_outputs=True)
+    assert default.equals(positional)
+    peaks = GC.GC_PEAKS_9MIN.copy()
+    peaks.loc['X'] = ['FID', 470, 510, 1000]
+    extended = GC.handle_GC_data(str(tmp_path), peaks=peaks, suppress_outputs=True)
+    assert list(extended.columns[:5]) == ['CO', 'CH4', 'C2H4', 'H2', 'X']
+    assert extended[positional.columns[:4]].equals(positional[positional.columns[:4]])
+    assert (extended['X'] > 0).all()
+    with pytest.raises(ValueError):
+        GC.handle_GC_data(str(tmp_path), COleft=180, suppress_outputs=True)
+
+
+def test_compute_FE_total_counts_products_only():
+    peaks = pd.DataFrame({'CO': [1e6, 2e6], 'CH4': [1e5, 2e5], 'C2H4': [1e6, 1.5e6], 'H2': [-1e4, -2e4]})
+    calibrations = GC.FE_CALIBRATIONS.copy()
+    calibrations['CO'] = 1e-5
+    fe = GC.compute_FE(peaks, calibrations=calibrations)
+    products = fe[['H2 FE/%', 'CH4 FE/%', 'C2H4 FE/%']].sum(axis=1)
+    assert (fe['CO FE/%'] > 0).all()
+    assert np.allclose(fe['Total Gas FE/%'], products)
+    fe = GC.compute_FE(peaks, calibrations=calibrations, products=('H2', 'C2H4'))
+    assert np.allclose(fe['Total Gas FE/%'], fe['H2 FE/%'] + fe['C2H4 FE/%'])
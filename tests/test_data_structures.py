@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_structures as ds
+
+
+def _experiment():
+    freq = np.logspace(5, 0, 50)
+    data = pd.DataFrame({'Freq/Hz': freq,
+                         'Zcx/ohm': 10 + 1 / freq - 1j / freq,
+                         'Phase/deg': np.linspace(-3, -60, 50)})
+    params = pd.Series({'current_mA': 200, 'area': 1.0}).to_frame() # column named 0
+    opt = [pd.DataFrame({'x': np.arange(3)}), pd.DataFrame({'Zcx/ohm': [1 + 2j, 3 - 4j]})]
+    return ds.experiment(data, params, opt)
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip('pyarrow')
+    exp = _experiment()
+    exp.to_parquet(str(tmp_path), 'run')
+    loaded = ds.read_experiment_parquet(str(tmp_path / 'run'))
+    pd.testing.assert_frame_equal(loaded.data, exp.data)
+    pd.testing.assert_frame_equal(loaded.params, exp.params)
+    assert len(loaded.opt) == 2
+    for loaded_opt, opt in zip(loaded.opt, exp.opt):
+        pd.testing.assert_frame_equal(loaded_opt, opt)
+
+
+def test_parquet_column_selection(tmp_path):
+    pytest.importorskip('pyarrow')
+    exp = _experiment()
+    exp.to_parquet(str(tmp_path), 'run')
+    loaded = ds.read_experiment_parquet(str(tmp_path / 'run'), columns=['Zcx/ohm', 'Freq/Hz'])
+    pd.testing.assert_frame_equal(loaded.data, exp.data[['Zcx/ohm', 'Freq/Hz']])
+    lazy = ds.lazy_experiment(str(tmp_path / 'run'), columns=['Zcx/ohm'])
+    pd.testing.assert_frame_equal(lazy.data, exp.data[['Zcx/ohm']])
+    pd.testing.assert_frame_equal(lazy.opt[1], exp.opt[1])
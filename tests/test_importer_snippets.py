@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import importer_snippets as imp
+
+
+def _write_eis_dta(path, points, aborted=True):
+    lines = ['EXPLAIN\n', 'TAG\tEISPOT\n', 'TITLE\tLABEL\tPotentiostatic EIS\tTest &Identifier\n',
+             'AREA\tQUANT\t1.0\tSample &Area (cm^2)\n',
+             'ZCURVE\tTABLE\t%d\n' % points,
+             '\tPt\tTime\tFreq\tZreal\tZimag\tZsig\tZmod\tZphz\tIdc\tVdc\tIERange\n',
+             '\t#\ts\tHz\tohm\tohm\tV\tohm\tdeg\tA\tV\t#\n']
+    for i in range(points):
+        # Zreal and Zmod are integer-valued, so pandas would type them int64 unless told otherwise
+        lines.append('\t%d\t%d\t%r\t%d\t%r\t1\t%d\t-10.5\t1e-06\t0.01\t5\n'
+                     % (i, i, 1e5 / (1 + i), 10 + i, -0.5 * i, 11 + i))
+    if aborted:
+        lines.append('EXPERIMENTABORTED\tTOGGLE\tT\tExperiment Aborted\n')
+    path.write_text(''.join(lines))
+
+
+@pytest.mark.parametrize('chunksize', [7, 25, 60])
+def test_gamry_chunks_have_consistent_dtypes(tmp_path, chunksize):
+    path = tmp_path / 'eis.DTA'
+    _write_eis_dta(path, 60)
+    chunks = list(imp.Gamry_dta(str(path), chunksize=chunksize))
+    for chunk in chunks[1:]:
+        pd.testing.assert_series_equal(chunk.dtypes, chunks[0].dtypes)
+    assert chunks[0]['Zre/ohm'].dtype == np.float64
+    
+    full = imp.Gamry_dta(str(path))
+    streamed = pd.concat(chunks)
+    assert len(streamed) == 60
+    pd.testing.assert_frame_equal(streamed, full, check_dtype=False)
+
+
+def _write_cv_dta(path, cycles, points):
+    lines = ['EXPLAIN\n', 'TAG\tCV\n', 'TITLE\tLABEL\tCyclic Voltammetry\tTest &Identifier\n',
+             'AREA\tQUANT\t1.0\tSample &Area (cm^2)\n',
+             'OCVCURVE\tTABLE\t2\n', '\tPt\tT\tVf\tVm\tAch\n', '\t#\ts\tV vs. Ref.\tV\tV\n',
+             '\t0\t0.0\t0.3\t0.3\t0\n', '\t1\t0.5\t0.3\t0.3\t0\n']
+    for cycle in range(1, cycles + 1):
+        lines += ['CURVE%d\tTABLE\t%d\n' % (cycle, points),
+                  '\tPt\tT\tVf\tIm\tVu\tSig\tAch\tIERange\tOver\tTemp\n',
+                  '\t#\ts\tV vs. Ref.\tA\tV\tV\tV\t#\tbits\tdeg C\n']
+        for i in range(points):
+            lines.append('\t%d\t%r\t%r\t%r\t0\t0.1\t0\t7\t...........\t25.0\n'
+                         % (i, 0.1 * i, 0.01 * i, 1e-4 * cycle * i))
+    lines.append('EXPERIMENTABORTED\tTOGGLE\tT\tExperiment Aborted\n')
+    path.write_text(''.join(lines))
+
+
+def test_gamry_multiple_curves(tmp_path):
+    path = tmp_path / 'cv.DTA'
+    _write_cv_dta(path, 3, 4)
+    df = imp.Gamry_dta(str(path))
+    assert len(df) == 12
+    assert df['Curve'].tolist() == [1] * 4 + [2] * 4 + [3] * 4
+    np.testing.assert_allclose(df['Current/A'], [1e-4 * cycle * i for cycle in (1, 2, 3) for i in range(4)])
+    assert list(df.index) == list(range(4)) * 3
+    
+    streamed = pd.concat(imp.Gamry_dta(str(path), chunksize=5))
+    pd.testing.assert_frame_equal(streamed, df, check_dtype=False)
+    
+    data, errors = imp.import_folder(str(tmp_path))
+    assert errors == {} and len(data[str(tmp_path / 'cv')]) == 12
+
+
+def test_gamry_unnumbered_second_table_raises(tmp_path):
+    path = tmp_path / 'eis.DTA'
+    _write_eis_dta(path, 5, aborted=False)
+    with open(path, 'a') as f:
+        f.write('ZCURVE\tTABLE\t1\n\tPt\tTime\n\t#\ts\n\t0\t0\n')
+    with pytest.raises(ValueError):
+        imp.Gamry_dta(str(path))
+    with pytest.raises(ValueError):
+        list(imp.Gamry_dta(str(path), chunksize=2))
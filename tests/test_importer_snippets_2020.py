@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import importer_snippets_2020 as imp
+
+
+def _write_plate_export(path, scans, rng):
+    # Each scan: a column header line (also 12 commas), 8 labelled rows, then non-data lines
+    lines = ['Plate reader export\n']
+    plates = rng.integers(0, 4000, (scans, 8, 12))
+    for scan in range(scans):
+        lines.append(',' + ','.join(str(column) for column in range(1, 13)) + '\n')
+        for row, values in zip(imp.ELISA_ROWS, plates[scan]):
+            lines.append(row + ',' + ','.join('+%05d' % value for value in values) + '\n')
+        lines += ['\n', 'Scan %d,Temp 25C\n' % (scan + 1)]
+    path.write_text(''.join(lines))
+    return plates / 1000
+
+
+@pytest.mark.parametrize('scans', [1, 3, 8])
+def test_read_ELISA_plates_skips_column_header_lines(tmp_path, scans):
+    expected = _write_plate_export(tmp_path / 'plates.txt', scans, np.random.default_rng(scans))
+    plates = imp.read_ELISA_plates(str(tmp_path / 'plates.txt'))
+    np.testing.assert_array_equal(plates, expected)
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous wall-clock budget for importing the three modules in a fresh interpreter (pandas/numpy dominate)
+IMPORT_BUDGET_SECONDS = 5.0
+
+SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import data_structures, importer_snippets, importer_snippets_2020
+print(time.perf_counter() - start)
+print(','.join(module for module in ['tkinter', 'openpyxl'] if module in sys.modules))
+'''
+
+
+def test_importers_import_headless_within_budget():
+    env = {key: value for key, value in os.environ.items() if key != 'DISPLAY'}
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    seconds, loaded = result.stdout.splitlines()
+    assert loaded == '', 'imported at module load: ' + loaded
+    assert float(seconds) < IMPORT_BUDGET_SECONDS